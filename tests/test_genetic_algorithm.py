@@ -0,0 +1,43 @@
+import datetime
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import курс
+
+
+CURRENT_DATE = datetime.date(2024, 5, 20)
+
+
+def signature(schedule):
+    return [(route.start_time, route.end_time, route.driver_id) for route in schedule.routes]
+
+
+@pytest.mark.parametrize("options", [{}, {'islands': 2, 'migration_interval': 3}, {'stall_generations': 2}])
+def test_generator_matches_genetic_algorithm(options):
+    best = курс.genetic_algorithm(8, 10, 5, CURRENT_DATE, seed=6, **options)
+    steps = list(курс.genetic_algorithm_iter(8, 10, 5, CURRENT_DATE, seed=6, **options))
+
+    assert signature(steps[-1][1]) == signature(best)
+
+
+def test_generator_reports_progress_and_stops_on_cancel():
+    reported = []
+    cancel_event = курс.threading.Event()
+    steps = курс.genetic_algorithm_iter(8, 10, 5, CURRENT_DATE, seed=6, cancel_event=cancel_event,
+                                        progress=lambda generation, best, mean: reported.append(generation))
+    for generation, schedule in steps:
+        if generation == 3:
+            cancel_event.set()
+
+    assert reported == [1, 2, 3]
+
+
+def test_population_size_and_generations_are_parameters():
+    steps = list(курс.genetic_algorithm_iter(8, 10, 5, CURRENT_DATE, seed=6, population_size=6, generations=4))
+
+    assert [generation for generation, schedule in steps] == [1, 2, 3, 4]
+    assert (курс.POPULATION_SIZE, курс.GENERATIONS) == (50, 100)
@@ -0,0 +1,44 @@
+import datetime
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import курс
+
+
+CURRENT_DATE = datetime.date(2024, 5, 20)
+
+
+def test_operators_leave_parents_as_lists():
+    random.seed(4)
+    first = курс.generate_random_schedule(8, 10, 5, CURRENT_DATE)
+    second = курс.generate_random_schedule(8, 10, 5, CURRENT_DATE)
+    routes, drivers = list(first.routes), list(first.drivers)
+
+    child = курс.crossover(first, second)
+    for _ in range(20):
+        курс.mutate(first)
+
+    assert type(first.routes) is list and type(first.drivers) is list
+    assert type(second.routes) is list and type(second.drivers) is list
+    assert first.routes == routes and first.drivers == drivers
+    assert isinstance(child.routes, курс.Genome)
+
+
+def test_child_accepts_new_routes_and_drivers():
+    random.seed(5)
+    first = курс.generate_random_schedule(8, 10, 5, CURRENT_DATE)
+    second = курс.generate_random_schedule(8, 10, 5, CURRENT_DATE)
+    child = курс.crossover(first, second)
+    shared = list(first.routes)
+    total_routes, peak_routes, unique_drivers = child.calculate_metrics()
+
+    route = курс.Route(datetime.datetime.combine(CURRENT_DATE, курс.PEAK_HOURS_START_1), 60, None)
+    child.add_route(route)
+    child.add_driver(курс.Driver('A', 'new'))
+
+    assert child.calculate_metrics() == (total_routes + 1, peak_routes + 1, unique_drivers + 1)
+    assert child.routes[-1] is route
+    assert first.routes == shared
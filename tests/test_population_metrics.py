@@ -0,0 +1,94 @@
+import datetime
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+import курс
+
+
+WEEKDAY = datetime.date(2024, 5, 20)
+WEEKEND = datetime.date(2024, 5, 25)
+
+
+def make_population(current_date, size=12):
+    random.seed(7)
+    population = [курс.generate_random_schedule(8, 10, 5, current_date) for _ in range(size)]
+    children = []
+    for first, second in zip(population, population[1:]):
+        children.append(курс.crossover(first, second))
+        children.append(курс.mutate(курс.crossover(second, first)))
+    return population + children + [курс.Schedule()]
+
+
+def expected(population):
+    for schedule in population:
+        schedule.invalidate()
+    metrics = [курс.Schedule.calculate_metrics(schedule) for schedule in population]
+    for schedule in population:
+        schedule.invalidate()
+    return metrics, [курс.fitness(schedule) for schedule in population]
+
+
+@pytest.mark.parametrize("current_date", [WEEKDAY, WEEKEND])
+def test_population_metrics_match_per_schedule(current_date):
+    population = make_population(current_date)
+    metrics, fitness_values = expected(population)
+
+    total_routes, peak_routes, unique_drivers, batch_fitness = курс.calculate_population_metrics(population)
+
+    assert list(zip(total_routes.tolist(), peak_routes.tolist(), unique_drivers.tolist())) == metrics
+    assert batch_fitness.tolist() == fitness_values
+
+
+@pytest.mark.parametrize("current_date", [WEEKDAY, WEEKEND])
+def test_vectorized_evaluation_matches_fitness(current_date):
+    population = make_population(current_date)
+    metrics, fitness_values = expected(population)
+    for schedule in population:
+        schedule.invalidate()
+
+    assert курс.evaluate_population_vectorized(population) == fitness_values
+    assert [schedule.calculate_metrics() for schedule in population] == metrics
+
+
+def test_empty_population():
+    total_routes, peak_routes, unique_drivers, fitness_values = курс.calculate_population_metrics([])
+    assert len(total_routes) == len(peak_routes) == len(unique_drivers) == len(fitness_values) == 0
+    assert курс.evaluate_population_vectorized([]) == []
+
+
+def test_vectorized_ranking_keeps_seeded_result():
+    default = курс.genetic_algorithm(8, 10, 5, WEEKDAY, seed=3)
+    vectorized = курс.genetic_algorithm(8, 10, 5, WEEKDAY, seed=3, vectorized=True)
+    assert vectorized.calculate_metrics() == default.calculate_metrics()
+    assert [route.start_time for route in vectorized.routes] == [route.start_time for route in default.routes]
+
+
+def test_fitness_and_metrics_counters_are_separate():
+    population = make_population(WEEKDAY)
+    for schedule in population:
+        schedule.invalidate()
+    курс.reset_metrics_cache_stats()
+
+    курс.evaluate_population_vectorized(population)
+    курс.evaluate_population_vectorized(population)
+    for schedule in population:
+        курс.fitness(schedule)
+
+    assert курс.FITNESS_CACHE_STATS == {'hits': 2 * len(population), 'misses': len(population)}
+    assert курс.METRICS_CACHE_STATS == {'hits': 0, 'misses': 0}
+
+
+def test_demand_score_does_not_replace_fitness():
+    population = make_population(WEEKDAY)
+    metrics, fitness_values = expected(population)
+
+    demand_values = курс.evaluate_population_demand(population, WEEKDAY)
+
+    assert [курс.fitness(schedule) for schedule in population] == fitness_values
+    assert demand_values == курс.demand_fitness_values(population, WEEKDAY).tolist()
@@ -0,0 +1,129 @@
+import datetime
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import курс
+from курс import ChangeEvent
+
+
+CURRENT_DATE = datetime.date(2024, 5, 20)
+
+
+def at(hour, minute=0):
+    return datetime.datetime.combine(CURRENT_DATE, datetime.time(hour, minute))
+
+
+def make_schedule(drivers, routes, breaks=()):
+    schedule = курс.Schedule()
+    by_id = {}
+    for driver_id in drivers:
+        driver = курс.Driver(driver_id[0], driver_id)
+        schedule.drivers.append(driver)
+        by_id[driver_id] = driver
+    for driver_id, start_time, end_time in breaks:
+        by_id[driver_id].schedule.append((start_time, end_time, 'break'))
+    for driver_id, start_time, end_time in routes:
+        minutes = (end_time - start_time) // datetime.timedelta(minutes=1)
+        schedule.routes.append(курс.Route(start_time, minutes, driver_id))
+    return schedule
+
+
+def assignments(schedule):
+    return [(route.start_time, route.end_time, route.driver_id) for route in schedule.routes]
+
+
+def test_driver_removed_reassigns_future_routes():
+    schedule = make_schedule(['A1', 'A2'], [('A1', at(8), at(9)), ('A2', at(8), at(9)), ('A1', at(10), at(11))])
+
+    repaired, diff = курс.repair_schedule(schedule, ChangeEvent(ChangeEvent.DRIVER_REMOVED, driver_id='A1'), at(9, 30))
+
+    assert assignments(repaired) == [(at(8), at(9), 'A1'), (at(8), at(9), 'A2'), (at(10), at(11), 'A2')]
+    assert diff == {'reassigned': [(at(10), at(11), 'A1', 'A2')], 'added': [], 'removed': [], 'unassigned': []}
+    assert assignments(schedule)[-1] == (at(10), at(11), 'A1')
+
+
+def test_driver_removed_without_free_driver_leaves_route_unassigned():
+    schedule = make_schedule(['A1', 'A2'], [('A1', at(10), at(11)), ('A2', at(10), at(11))])
+
+    repaired, diff = курс.repair_schedule(schedule, ChangeEvent(ChangeEvent.DRIVER_REMOVED, driver_id='A1'), at(9))
+
+    assert assignments(repaired) == [(at(10), at(11), 'A2')]
+    assert diff == {'reassigned': [], 'added': [], 'removed': [], 'unassigned': [(at(10), at(11), 'A1')]}
+
+
+def test_unknown_driver_is_rejected():
+    schedule = make_schedule(['A1'], [('A1', at(10), at(11))])
+    with pytest.raises(ValueError):
+        курс.repair_schedule(schedule, ChangeEvent(ChangeEvent.DRIVER_REMOVED, driver_id='B9'), at(9))
+
+
+def test_bus_removed_drops_one_route_per_future_wave():
+    schedule = make_schedule(['A1', 'A2'], [('A1', at(8), at(9)), ('A2', at(8), at(9)),
+                                            ('A1', at(10), at(11)), ('A2', at(10), at(11))])
+
+    repaired, diff = курс.repair_schedule(schedule, ChangeEvent(ChangeEvent.BUS_REMOVED), at(9, 30))
+
+    assert assignments(repaired) == [(at(8), at(9), 'A1'), (at(8), at(9), 'A2'), (at(10), at(11), 'A1')]
+    assert diff == {'reassigned': [], 'added': [], 'removed': [(at(10), at(11), 'A2')], 'unassigned': []}
+
+
+def test_bus_added_gives_new_routes_to_free_drivers():
+    schedule = make_schedule(['A1', 'A2'], [('A1', at(10), at(11)), ('A1', at(12), at(13))])
+
+    repaired, diff = курс.repair_schedule(schedule, ChangeEvent(ChangeEvent.BUS_ADDED), at(9))
+
+    assert sorted(assignments(repaired)) == [(at(10), at(11), 'A1'), (at(10), at(11), 'A2'),
+                                             (at(12), at(13), 'A1'), (at(12), at(13), 'A2')]
+    assert diff == {'reassigned': [], 'added': [(at(10), at(11), 'A2'), (at(12), at(13), 'A2')],
+                    'removed': [], 'unassigned': []}
+
+
+def test_route_delayed_keeps_driver_when_possible():
+    schedule = make_schedule(['A1', 'A2'], [('A1', at(10), at(11)), ('A1', at(13), at(14))])
+
+    repaired, diff = курс.repair_schedule(schedule, ChangeEvent(ChangeEvent.ROUTE_DELAYED, route_index=0, delay_minutes=30), at(9))
+
+    assert assignments(repaired) == [(at(10, 30), at(11, 30), 'A1'), (at(13), at(14), 'A1')]
+    assert diff == {'reassigned': [], 'added': [], 'removed': [], 'unassigned': []}
+
+
+def test_route_delayed_into_next_route_moves_to_another_driver():
+    schedule = make_schedule(['A1', 'A2'], [('A1', at(10), at(11)), ('A1', at(11, 15), at(12))])
+
+    repaired, diff = курс.repair_schedule(schedule, ChangeEvent(ChangeEvent.ROUTE_DELAYED, route_index=0, delay_minutes=30), at(9))
+
+    assert assignments(repaired) == [(at(10, 30), at(11, 30), 'A2'), (at(11, 15), at(12), 'A1')]
+    assert diff == {'reassigned': [(at(10, 30), at(11, 30), 'A1', 'A2')], 'added': [], 'removed': [], 'unassigned': []}
+
+
+def test_started_route_cannot_be_delayed():
+    schedule = make_schedule(['A1'], [('A1', at(10), at(11))])
+    with pytest.raises(ValueError):
+        курс.repair_schedule(schedule, ChangeEvent(ChangeEvent.ROUTE_DELAYED, route_index=0, delay_minutes=10), at(10, 30))
+
+
+def test_type_b_driver_needs_long_break_after_break_frequency():
+    routes = [('B1', at(8), at(10)), ('B2', at(10, 5), at(11))]
+    schedule = make_schedule(['B1', 'B2'], routes)
+    repaired, diff = курс.repair_schedule(schedule, ChangeEvent(ChangeEvent.DRIVER_REMOVED, driver_id='B2'), at(9))
+    assert diff['unassigned'] == [(at(10, 5), at(11), 'B2')]
+
+    routes = [('B1', at(8), at(10)), ('B2', at(10, 45), at(11, 30))]
+    rested = make_schedule(['B1', 'B2'], routes, breaks=[('B1', at(10), at(10, 40))])
+    repaired, diff = курс.repair_schedule(rested, ChangeEvent(ChangeEvent.DRIVER_REMOVED, driver_id='B2'), at(9))
+    assert diff['reassigned'] == [(at(10, 45), at(11, 30), 'B2', 'B1')]
+
+
+def test_type_a_lunch_is_required_only_with_lunches():
+    schedule = make_schedule(['A1', 'A2'], [('A1', at(8), at(12)), ('A2', at(12, 30), at(13))])
+    event = ChangeEvent(ChangeEvent.DRIVER_REMOVED, driver_id='A2')
+
+    repaired, diff = курс.repair_schedule(schedule, event, at(9), lunches=True)
+    assert diff['unassigned'] == [(at(12, 30), at(13), 'A2')]
+
+    repaired, diff = курс.repair_schedule(schedule, event, at(9))
+    assert diff['reassigned'] == [(at(12, 30), at(13), 'A2', 'A1')]
@@ -1,12 +1,26 @@
 import datetime
 import random
 import csv
-import tkinter as tk
-from tkinter import ttk
-from tkinter import filedialog
-from tkcalendar import DateEntry
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import json
+import os
+import pickle
+import queue
+import threading
+import time
+import tracemalloc
+import platform
+import subprocess
+import heapq
+import bisect
+import statistics
+import itertools
+import hashlib
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# tkinter, tkcalendar и matplotlib импортируются только при открытии окна,
+# чтобы ядро планирования можно было использовать без дисплея
 
 # Константы 
 SHIFT_START_TIME = datetime.time(6, 0)
@@ -25,6 +39,9 @@ DRIVER_B_BREAK_FREQUENCY = 120
 DRIVER_B_LONG_BREAK_MINUTES = 40
 ROUTE_TIME_MIN_MINUTES = 65
 ROUTE_TIME_MAX_MINUTES = 75
+DRIVER_A_WEEK_HOURS = 40
+DRIVER_B_WEEK_HOURS = 48
+DRIVER_REST_HOURS = 11
 PASSENGER_FLOW = 1000
 PEAK_PASSENGER_PERCENT = 0.7
 
@@ -33,23 +50,61 @@ POPULATION_SIZE = 50
 GENERATIONS = 100
 MUTATION_RATE = 0.1
 
+#  Размер кэша готовых результатов (число разных наборов входных данных) 
+RESULT_CACHE_SIZE = 16
+
+#  Потоковая выгрузка: число строк в одном блоке записи 
+EXPORT_CHUNK_ROWS = 10000
+
+#  Размер блока неизменяемого генома (см. Genome) 
+GENOME_CHUNK_SIZE = 32
+
+#  Параметры параллельного режима (модель островов) 
+ISLAND_MIGRATION_INTERVAL = 10
+ISLAND_MIGRATION_SIZE = 2
+
+# Отметка "перерыва ещё не было" (начальное значение Driver.last_break)
+NO_BREAK = datetime.datetime.combine(datetime.date.min, SHIFT_START_TIME)
+
+# Те же интервалы в виде готовых timedelta, чтобы не создавать их во внутренних циклах
+DRIVER_A_WORK_LIMIT = datetime.timedelta(hours=DRIVER_A_WORK_HOURS)
+DRIVER_B_WORK_LIMIT = datetime.timedelta(hours=DRIVER_B_WORK_HOURS)
+DRIVER_A_LUNCH = datetime.timedelta(minutes=DRIVER_A_LUNCH_MINUTES)
+DRIVER_A_WEEK_LIMIT = datetime.timedelta(hours=DRIVER_A_WEEK_HOURS)
+DRIVER_B_WEEK_LIMIT = datetime.timedelta(hours=DRIVER_B_WEEK_HOURS)
+DRIVER_REST = datetime.timedelta(hours=DRIVER_REST_HOURS)
+DRIVER_B_BREAK_INTERVAL = datetime.timedelta(minutes=DRIVER_B_BREAK_FREQUENCY)
+DRIVER_B_LONG_BREAK = datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
+
 # Дни недели 
 WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
 WEEKEND = ["Saturday", "Sunday"]
 
 #  Структуры данных 
 class Driver:
+    __slots__ = ('type', 'schedule', 'total_work_time', 'last_break', 'id')
+
     def __init__(self, driver_type, id):
         self.type = driver_type
         self.schedule = []
         self.total_work_time = datetime.timedelta()
-        self.last_break = datetime.datetime.combine(datetime.date.min, SHIFT_START_TIME)
+        self.last_break = NO_BREAK
         self.id = id
 
     def __repr__(self):
         return f"Driver(id={self.id}, type={self.type}, schedule={len(self.schedule)} shifts, worktime = {self.total_work_time})"
 
+    # Копия водителя с другим типом; список смен общий с исходным водителем
+    def with_type(self, driver_type):
+        driver = Driver(driver_type, self.id)
+        driver.schedule = self.schedule
+        driver.total_work_time = self.total_work_time
+        driver.last_break = self.last_break
+        return driver
+
 class Route:
+    __slots__ = ('start_time', 'end_time', 'driver_id')
+
     def __init__(self, start_time, route_time, driver_id):
         self.start_time = start_time
         self.end_time = start_time + datetime.timedelta(minutes=route_time)
@@ -63,14 +118,38 @@ class Schedule:
     def __init__(self):
         self.routes = []
         self.drivers = []
-
+        # Кэш метрик и оценок (по числу маршрутов и по пассажиропотоку). Сбрасывается
+        # в add_route/add_driver и при мутации; при изменении routes/drivers
+        # напрямую нужно вызвать invalidate()
+        self._metrics = None
+        self._fitness = None
+        self._demand_fitness = None
+
+    # У потомков генетического алгоритма маршруты и водители лежат в неизменяемых
+    # геномах; при добавлении такой геном заменяется собственным списком
     def add_route(self, route):
+        if isinstance(self.routes, Genome):
+            self.routes = list(self.routes)
         self.routes.append(route)
+        self.invalidate()
 
     def add_driver(self, driver):
+        if isinstance(self.drivers, Genome):
+            self.drivers = list(self.drivers)
         self.drivers.append(driver)
+        self.invalidate()
+
+    def invalidate(self):
+        self._metrics = None
+        self._fitness = None
+        self._demand_fitness = None
 
     def calculate_metrics(self):
+        if self._metrics is not None:
+            METRICS_CACHE_STATS['hits'] += 1
+            return self._metrics
+        METRICS_CACHE_STATS['misses'] += 1
+
         peak_routes = 0
         for route in self.routes:
             if (
@@ -80,7 +159,102 @@ class Schedule:
               peak_routes += 1
         unique_drivers = len(self.drivers)
         total_routes = len(self.routes)
-        return total_routes, peak_routes, unique_drivers
+        self._metrics = (total_routes, peak_routes, unique_drivers)
+        return self._metrics
+
+#  Неизменяемый геном для генетического алгоритма 
+# Последовательность хранится блоками-кортежами по GENOME_CHUNK_SIZE элементов.
+# Скрещивание и замена элемента создают новый геном, который разделяет с
+# исходными все нетронутые блоки, поэтому потомки не портят родителей, а память
+# на поколение растёт с размером изменения, а не с размером популяции.
+class Genome:
+    __slots__ = ('_chunks', '_offsets', '_length')
+
+    def __init__(self, items=(), chunks=None):
+        if chunks is None:
+            items = tuple(items)
+            chunks = [items[i:i + GENOME_CHUNK_SIZE] for i in range(0, len(items), GENOME_CHUNK_SIZE)]
+        self._chunks = tuple(chunk for chunk in chunks if chunk)
+        offsets = []
+        length = 0
+        for chunk in self._chunks:
+            offsets.append(length)
+            length += len(chunk)
+        self._offsets = tuple(offsets)
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __repr__(self):
+        return f"Genome({list(self)!r})"
+
+    def _locate(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Genome index out of range")
+        chunk_index = bisect.bisect_right(self._offsets, index) - 1
+        return chunk_index, index - self._offsets[chunk_index]
+
+    def __getitem__(self, index):
+        chunk_index, position = self._locate(index)
+        return self._chunks[chunk_index][position]
+
+    def replace(self, index, value):
+        chunk_index, position = self._locate(index)
+        chunk = self._chunks[chunk_index]
+        chunks = list(self._chunks)
+        chunks[chunk_index] = chunk[:position] + (value,) + chunk[position + 1:]
+        return Genome(chunks=chunks)
+
+    # Первые split элементов этого генома и элементы other начиная с split
+    def splice(self, split, other):
+        left, left_tail = self._split(split, keep='left')
+        right_head, right = other._split(split, keep='right')
+        middle = left_tail + right_head
+        if len(middle) > GENOME_CHUNK_SIZE:
+            middle_chunks = [middle[:GENOME_CHUNK_SIZE], middle[GENOME_CHUNK_SIZE:]]
+        else:
+            middle_chunks = [middle]
+        return Genome(chunks=list(left) + middle_chunks + list(right))
+
+    # Целые блоки по одну сторону от split и неполный блок на границе
+    def _split(self, split, keep):
+        split = max(0, min(split, self._length))
+        if split == self._length:
+            return (self._chunks, ()) if keep == 'left' else ((), ())
+        chunk_index, position = self._locate(split)
+        chunk = self._chunks[chunk_index]
+        if keep == 'left':
+            return self._chunks[:chunk_index], chunk[:position]
+        return chunk[position:], self._chunks[chunk_index + 1:]
+
+
+def as_genome(items):
+    return items if isinstance(items, Genome) else Genome(items)
+
+
+#  Счётчики кэшей метрик и оценки (misses - сколько раз значение действительно пересчитывалось) 
+METRICS_CACHE_STATS = {'hits': 0, 'misses': 0}
+FITNESS_CACHE_STATS = {'hits': 0, 'misses': 0}
+
+def reset_metrics_cache_stats():
+    for stats in (METRICS_CACHE_STATS, FITNESS_CACHE_STATS):
+        stats['hits'] = 0
+        stats['misses'] = 0
+
+#  Начало смены и окна часа пик в минутах от полуночи (для расчётов на NumPy) 
+SHIFT_START_MINUTE = SHIFT_START_TIME.hour * 60 + SHIFT_START_TIME.minute
+PEAK_WINDOWS_MINUTES = (
+    (PEAK_HOURS_START_1.hour * 60 + PEAK_HOURS_START_1.minute, PEAK_HOURS_END_1.hour * 60 + PEAK_HOURS_END_1.minute),
+    (PEAK_HOURS_START_2.hour * 60 + PEAK_HOURS_START_2.minute, PEAK_HOURS_END_2.hour * 60 + PEAK_HOURS_END_2.minute),
+)
+
 
 # Проверка на час пик 
 def is_peak_hour(time):
@@ -90,457 +264,2620 @@ def is_peak_hour(time):
 def is_weekend(date):
    return date.strftime('%A') in WEEKEND
 
-# Прямой алгоритм создания расписания 
-def create_straight_schedule(num_buses, num_drivers_a, num_drivers_b, current_date):
-    schedule = Schedule()
-    drivers_a = []
-    drivers_b = []
+#  Правила смены водителя (общие для пула и перепланирования) 
+# Тип A после половины 8-часовой смены без перерыва должен уйти на обед, тип B,
+# отработав DRIVER_B_BREAK_FREQUENCY минут без перерыва за это время, - на длинный перерыв
+def needs_lunch(driver):
+    return driver.type == 'A' and driver.last_break == NO_BREAK and driver.total_work_time >= DRIVER_A_WORK_LIMIT / 2
+
+
+def needs_long_break(driver, current_time):
+    return (driver.type == 'B' and driver.total_work_time >= DRIVER_B_BREAK_INTERVAL
+            and driver.last_break <= current_time - DRIVER_B_BREAK_INTERVAL)
+
+
+#  Пул свободных водителей 
+# Занятые водители лежат в куче по времени освобождения, освободившиеся - в куче
+# готовых по ключу выбора: в прямом алгоритме сначала тип A, затем по номеру,
+# в случайном - случайный ключ, выдаваемый при освобождении. Взятие и возврат
+# водителя - O(log n). Пул сам следит за 8-часовой сменой типа A, 12-часовой
+# сменой типа B и длинными перерывами типа B; при lunches=True водитель типа A
+# после половины смены уходит на обед (DRIVER_A_LUNCH_MINUTES).
+# limits и start_times (по id водителя) задают уменьшенную смену и время, с
+# которого водитель доступен, - так учитываются часы, отработанные в прошлые дни.
+class DriverPool:
+    def __init__(self, drivers, start_time, randomized=False, lunches=False, limits=None, start_times=None):
+        self.randomized = randomized
+        self.lunches = lunches
+        self.limits = limits or {}
+        self._counter = itertools.count()
+        self._busy = []
+        self._ready = []
+        self._priority = {}
+        start_times = start_times or {}
+        for index, driver in enumerate(drivers):
+            self._priority[driver.id] = (0 if driver.type == 'A' else 1, index)
+            self.release(driver, start_times.get(driver.id, start_time))
+
+    def __len__(self):
+        return len(self._busy) + len(self._ready)
+
+    def release(self, driver, free_time):
+        heapq.heappush(self._busy, (free_time, next(self._counter), driver))
+
+    def _refresh(self, current_time):
+        while self._busy and self._busy[0][0] <= current_time:
+            free_time, order, driver = heapq.heappop(self._busy)
+            key = random.random() if self.randomized else self._priority[driver.id]
+            heapq.heappush(self._ready, (key, order, driver))
+
+    def acquire(self, current_time, route_duration):
+        self._refresh(current_time)
+        while self._ready:
+            key, order, driver = heapq.heappop(self._ready)
+            if driver.type == 'A':
+                # Водитель, не успевающий маршрут до конца 8-часовой смены, выбывает
+                if driver.total_work_time + route_duration > self.limits.get(driver.id, DRIVER_A_WORK_LIMIT):
+                    continue
+                if self.lunches and needs_lunch(driver):
+                    lunch_end_time = current_time + DRIVER_A_LUNCH
+                    driver.schedule.append((current_time, lunch_end_time, 'break'))
+                    driver.last_break = lunch_end_time
+                    self.release(driver, lunch_end_time)
+                    continue
+                return driver
+
+            if driver.total_work_time + route_duration > self.limits.get(driver.id, DRIVER_B_WORK_LIMIT):
+                continue
+            # Проверка, нужно ли дать перерыв: водитель уходит на перерыв и
+            # возвращается в пул после его окончания
+            if needs_long_break(driver, current_time):
+                break_end_time = current_time + DRIVER_B_LONG_BREAK
+                driver.schedule.append((current_time, break_end_time, 'break'))
+                driver.total_work_time += DRIVER_B_LONG_BREAK
+                driver.last_break = break_end_time
+                self.release(driver, break_end_time)
+                continue
+            return driver
+        return None
+
+
+#  Рейсы дня: волны отправлений (время, длительность маршрута, число автобусов) 
+def iterate_departures(num_buses, current_date):
     current_time = datetime.datetime.combine(current_date, SHIFT_START_TIME)
+    weekend = is_weekend(current_date)
 
-    # Создание водителей типа A
-    for i in range(num_drivers_a):
-        drivers_a.append(Driver('A', f'A{i+1}'))
-    # Создание водителей типа B
-    for i in range(num_drivers_b):
-       drivers_b.append(Driver('B', f'B{i+1}'))
-
-    available_drivers_a = list(drivers_a)
-    available_drivers_b = list(drivers_b)
-    
-    
-    
     while current_time < datetime.datetime.combine(current_date, datetime.time(23, 59)):
         route_time = random.randint(ROUTE_TIME_MIN_MINUTES, ROUTE_TIME_MAX_MINUTES)
-        if is_peak_hour(current_time.time()) and not is_weekend(current_date): # Час пик в будни
-           
-            for _ in range(int(num_buses*PEAK_PASSENGER_PERCENT)):  # 70% маршрутов в часы пик
-                if available_drivers_a:
-                    driver = available_drivers_a[0]
-                    # Проверка, может ли водитель выполнить смену (8 часов)
-                    if driver.total_work_time + datetime.timedelta(minutes=route_time) <= datetime.timedelta(hours=DRIVER_A_WORK_HOURS):
-                        route = Route(current_time, route_time, driver.id)
-                        schedule.add_route(route)
-                        driver.schedule.append((route.start_time, route.end_time, 'route'))
-                        driver.total_work_time += datetime.timedelta(minutes=route_time)
-                    else:
-                         available_drivers_a.pop(0)
-                         continue
-                elif available_drivers_b:
-                    driver = available_drivers_b[0]
-                    
-                    # Проверка, нужно ли дать перерыв
-                    if driver.total_work_time >= datetime.timedelta(minutes=DRIVER_B_BREAK_FREQUENCY) and driver.last_break <= current_time - datetime.timedelta(minutes=DRIVER_B_BREAK_FREQUENCY):
-                        break_start_time = current_time
-                        break_end_time = current_time + datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
-                        driver.schedule.append((break_start_time, break_end_time, 'break'))
-                        driver.total_work_time += datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
-                        driver.last_break = break_end_time
-                        current_time += datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
-                        continue # Перерыв
-                    else:
-                        route = Route(current_time, route_time, driver.id)
-                        schedule.add_route(route)
-                        driver.schedule.append((route.start_time, route.end_time, 'route'))
-                        driver.total_work_time += datetime.timedelta(minutes=route_time)
-                        
-                        
-                else:
-                    break
+        if is_peak_hour(current_time.time()) and not weekend: # Час пик в будни
+            passenger_percent = PEAK_PASSENGER_PERCENT  # 70% маршрутов в часы пик
         else: # Остальное время (30% в будни и все время в выходные)
-            
-            passenger_percent = 1 - PEAK_PASSENGER_PERCENT if not is_weekend(current_date) else 1
-            for _ in range(int(num_buses * passenger_percent)):
-               if available_drivers_a:
-                   driver = available_drivers_a[0]
-                   
-                   # Проверка, может ли водитель выполнить смену (8 часов)
-                   if driver.total_work_time + datetime.timedelta(minutes=route_time) <= datetime.timedelta(hours=DRIVER_A_WORK_HOURS):
-                        route = Route(current_time, route_time, driver.id)
-                        schedule.add_route(route)
-                        driver.schedule.append((route.start_time, route.end_time, 'route'))
-                        driver.total_work_time += datetime.timedelta(minutes=route_time)
-                   else:
-                        available_drivers_a.pop(0)
-                        continue
-               elif available_drivers_b:
-                   driver = available_drivers_b[0]
-                   
-                   # Проверка, нужно ли дать перерыв
-                   if driver.total_work_time >= datetime.timedelta(minutes=DRIVER_B_BREAK_FREQUENCY) and driver.last_break <= current_time - datetime.timedelta(minutes=DRIVER_B_BREAK_FREQUENCY):
-                        break_start_time = current_time
-                        break_end_time = current_time + datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
-                        driver.schedule.append((break_start_time, break_end_time, 'break'))
-                        driver.total_work_time += datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
-                        driver.last_break = break_end_time
-                        current_time += datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
-                        continue # Перерыв
-                   else:
-                        route = Route(current_time, route_time, driver.id)
-                        schedule.add_route(route)
-                        driver.schedule.append((route.start_time, route.end_time, 'route'))
-                        driver.total_work_time += datetime.timedelta(minutes=route_time)
-               else:
-                    break
+            passenger_percent = 1 - PEAK_PASSENGER_PERCENT if not weekend else 1
+
+        yield current_time, route_time, int(num_buses * passenger_percent)
 
         current_time += datetime.timedelta(minutes=route_time + random.randint(SHIFT_CHANGE_TIME_MIN, SHIFT_CHANGE_TIME_MAX))
 
-    # Добавляем всех водителей в расписание
-    schedule.drivers.extend(drivers_a)
-    schedule.drivers.extend(drivers_b)
+
+#  Общий цикл построения расписания на день 
+# departures - готовые волны отправлений (list(iterate_departures(...))), чтобы
+# несколько алгоритмов работали с одними и теми же рейсами; без них волны
+# строятся заново
+def build_day_schedule(num_buses, drivers, current_date, randomized, departures=None):
+    schedule = Schedule()
+    pool = DriverPool(drivers, datetime.datetime.combine(current_date, SHIFT_START_TIME), randomized)
+
+    if departures is None:
+        departures = iterate_departures(num_buses, current_date)
+    for current_time, route_time, buses in departures:
+        route_duration = datetime.timedelta(minutes=route_time)
+        for _ in range(buses):
+            driver = pool.acquire(current_time, route_duration)
+            if driver is None:
+                break
+            route = Route(current_time, route_time, driver.id)
+            schedule.add_route(route)
+            driver.schedule.append((route.start_time, route.end_time, 'route'))
+            driver.total_work_time += route_duration
+            pool.release(driver, route.end_time)
+
+    schedule.drivers.extend(drivers)
     return schedule
 
 
-#  Генерация случайного расписания для генетического алгоритма 
-def generate_random_schedule(num_buses, num_drivers_a, num_drivers_b, current_date):
-    schedule = Schedule()
+# Прямой алгоритм создания расписания (всегда берётся первый свободный водитель, сначала тип A)
+def create_straight_schedule(num_buses, num_drivers_a, num_drivers_b, current_date, departures=None):
+    drivers = []
+    # Создание водителей типа A
+    for i in range(num_drivers_a):
+        drivers.append(Driver('A', f'A{i+1}'))
+    # Создание водителей типа B
+    for i in range(num_drivers_b):
+       drivers.append(Driver('B', f'B{i+1}'))
+    return build_day_schedule(num_buses, drivers, current_date, randomized=False, departures=departures)
+
+
+#  Генерация случайного расписания для генетического алгоритма (случайный свободный водитель) 
+def generate_random_schedule(num_buses, num_drivers_a, num_drivers_b, current_date, departures=None):
     drivers = []
     for i in range(num_drivers_a):
         drivers.append(Driver('A', f'A{i+1}'))
     for i in range(num_drivers_b):
         drivers.append(Driver('B', f'B{i+1}'))
-    
-    current_time = datetime.datetime.combine(current_date, SHIFT_START_TIME)
-    
-    while current_time < datetime.datetime.combine(current_date, datetime.time(23, 59)):
-        route_time = random.randint(ROUTE_TIME_MIN_MINUTES, ROUTE_TIME_MAX_MINUTES)
-        if is_peak_hour(current_time.time()) and not is_weekend(current_date): # Час пик в будни
-            for _ in range(int(num_buses * PEAK_PASSENGER_PERCENT)):
-                if drivers:
-                    driver = random.choice(drivers)
-                    if driver.type == 'A' and driver.total_work_time + datetime.timedelta(minutes=route_time) <= datetime.timedelta(hours=DRIVER_A_WORK_HOURS) :
-                         route = Route(current_time, route_time, driver.id)
-                         schedule.add_route(route)
-                         driver.schedule.append((route.start_time, route.end_time, 'route'))
-                         driver.total_work_time += datetime.timedelta(minutes=route_time)
-                    elif driver.type == 'B':
-                        
-                        if driver.total_work_time >= datetime.timedelta(minutes=DRIVER_B_BREAK_FREQUENCY) and driver.last_break <= current_time - datetime.timedelta(minutes=DRIVER_B_BREAK_FREQUENCY):
-                            break_start_time = current_time
-                            break_end_time = current_time + datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
-                            driver.schedule.append((break_start_time, break_end_time, 'break'))
-                            driver.total_work_time += datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
-                            driver.last_break = break_end_time
-                            current_time += datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
-                            continue
-                        else:
-                            route = Route(current_time, route_time, driver.id)
-                            schedule.add_route(route)
-                            driver.schedule.append((route.start_time, route.end_time, 'route'))
-                            driver.total_work_time += datetime.timedelta(minutes=route_time)
-                    else:
-                      drivers.remove(driver)
-                      continue
-                else:
-                    break
-        else: # Остальное время (30% в будни и все время в выходные)
-            passenger_percent = 1 - PEAK_PASSENGER_PERCENT if not is_weekend(current_date) else 1
-            for _ in range(int(num_buses * passenger_percent)):
-               if drivers:
-                  driver = random.choice(drivers)
-                  if driver.type == 'A' and driver.total_work_time + datetime.timedelta(minutes=route_time) <= datetime.timedelta(hours=DRIVER_A_WORK_HOURS) :
-                        route = Route(current_time, route_time, driver.id)
-                        schedule.add_route(route)
-                        driver.schedule.append((route.start_time, route.end_time, 'route'))
-                        driver.total_work_time += datetime.timedelta(minutes=route_time)
-                  elif driver.type == 'B':
-                        if driver.total_work_time >= datetime.timedelta(minutes=DRIVER_B_BREAK_FREQUENCY) and driver.last_break <= current_time - datetime.timedelta(minutes=DRIVER_B_BREAK_FREQUENCY):
-                            break_start_time = current_time
-                            break_end_time = current_time + datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
-                            driver.schedule.append((break_start_time, break_end_time, 'break'))
-                            driver.total_work_time += datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
-                            driver.last_break = break_end_time
-                            current_time += datetime.timedelta(minutes=DRIVER_B_LONG_BREAK_MINUTES)
-                            continue
-                        else:
-                            route = Route(current_time, route_time, driver.id)
-                            schedule.add_route(route)
-                            driver.schedule.append((route.start_time, route.end_time, 'route'))
-                            driver.total_work_time += datetime.timedelta(minutes=route_time)
-                  else:
-                        drivers.remove(driver)
-                        continue
-               else:
-                    break
-        current_time += datetime.timedelta(minutes=route_time + random.randint(SHIFT_CHANGE_TIME_MIN, SHIFT_CHANGE_TIME_MAX))
+    return build_day_schedule(num_buses, drivers, current_date, randomized=True, departures=departures)
+
+
+#  Интервальный алгоритм (третий): назначение водителей на готовое расписание рейсов 
+# Рейсы - список (время начала, длительность в минутах). Рейсы перебираются по
+# времени начала; каждый получает свободного водителя с наименьшим номером
+# (сначала тип A), новый водитель берётся, только если все уже занятые ещё в рейсе.
+# Без ограничений смены это точное решение задачи о разбиении интервалов:
+# водителей ровно столько, сколько рейсов идёт одновременно (max_concurrent_routes).
+# Ограничения смены, обеда и перерывов соблюдаются пулом водителей, поэтому это
+# число - нижняя граница числа водителей для любого алгоритма на тех же рейсах;
+# она выводится в сравнении рядом с результатами алгоритмов.
+def route_timetable(num_buses, current_date, departures=None):
+    if departures is None:
+        departures = iterate_departures(num_buses, current_date)
+    return [(current_time, route_time)
+            for current_time, route_time, buses in departures
+            for _ in range(buses)]
+
+
+def max_concurrent_routes(timetable):
+    events = []
+    for start_time, route_time in timetable:
+        events.append((start_time, 1))
+        events.append((start_time + datetime.timedelta(minutes=route_time), -1))
+    events.sort()  # окончание рейса (-1) раньше начала (+1) в ту же минуту
+    current = best = 0
+    for moment, change in events:
+        current += change
+        best = max(best, current)
+    return best
+
+
+def solve_interval_schedule(timetable, num_drivers_a, num_drivers_b, current_date, limits=None, start_times=None):
+    drivers = [Driver('A', f'A{i+1}') for i in range(num_drivers_a)]
+    drivers += [Driver('B', f'B{i+1}') for i in range(num_drivers_b)]
+    pool = DriverPool(drivers, datetime.datetime.combine(current_date, SHIFT_START_TIME), lunches=True,
+                      limits=limits, start_times=start_times)
 
-    schedule.drivers.extend(drivers)
+    schedule = Schedule()
+    for start_time, route_time in sorted(timetable, key=lambda item: item[0]):
+        route_duration = datetime.timedelta(minutes=route_time)
+        driver = pool.acquire(start_time, route_duration)
+        if driver is None:
+            continue  # рейс остаётся без водителя
+        route = Route(start_time, route_time, driver.id)
+        schedule.add_route(route)
+        driver.schedule.append((route.start_time, route.end_time, 'route'))
+        driver.total_work_time += route_duration
+        pool.release(driver, route.end_time)
+
+    # В расписание попадают только водители, которым достались рейсы
+    schedule.drivers.extend(driver for driver in drivers if driver.total_work_time)
     return schedule
 
 
+def create_interval_schedule(num_buses, num_drivers_a, num_drivers_b, current_date, departures=None):
+    return solve_interval_schedule(route_timetable(num_buses, current_date, departures), num_drivers_a, num_drivers_b, current_date)
+
+
+#  Планирование на несколько дней 
+# Рейсы для будней и выходных строятся один раз (по шаблону в минутах от начала
+# смены) и переиспользуются всеми днями такого типа. Водители назначаются
+# интервальным алгоритмом; часы за неделю (DRIVER_*_WEEK_HOURS) и отдых между
+# сменами (DRIVER_REST_HOURS) переносятся со дня на день. Часы сбрасываются в
+# понедельник, а отдых переходит и через границу недель, поэтому с carry_over
+# дни считаются подряд в одном процессе; при carry_over=False все дни
+# независимы и при workers > 1 считаются в отдельных процессах.
+class MultiDaySchedule(Schedule):
+    def __init__(self, days=()):
+        super().__init__()
+        self.days = []
+        merged = {}
+        for day, schedule in days:
+            self.days.append((day, schedule))
+            self.routes.extend(schedule.routes)
+            for driver in schedule.drivers:
+                if driver.id not in merged:
+                    merged[driver.id] = Driver(driver.type, driver.id)
+                    self.drivers.append(merged[driver.id])
+                total = merged[driver.id]
+                total.schedule.extend(driver.schedule)
+                total.total_work_time += driver.total_work_time
+                total.last_break = max(total.last_break, driver.last_break)
+
+    def __repr__(self):
+        return f"MultiDaySchedule(days={len(self.days)}, routes={len(self.routes)}, drivers={len(self.drivers)})"
+
+
+def timetable_template(num_buses, template_date):
+    base_time = datetime.datetime.combine(template_date, SHIFT_START_TIME)
+    return tuple(((start_time - base_time) // datetime.timedelta(minutes=1), route_time)
+                 for start_time, route_time in route_timetable(num_buses, template_date))
+
+
+def plan_days(dates, num_buses, num_drivers_a, num_drivers_b, templates, carry_over=True):
+    worked = {}     # id водителя -> часы с начала недели
+    last_end = {}   # id водителя -> конец последнего события
+    days = []
+    for day in dates:
+        if day.weekday() == 0:
+            worked.clear()
+        day_start = datetime.datetime.combine(day, SHIFT_START_TIME)
+        limits = {}
+        start_times = {}
+        if carry_over:
+            for i in range(num_drivers_a):
+                driver_id = f'A{i+1}'
+                limits[driver_id] = max(datetime.timedelta(), min(DRIVER_A_WORK_LIMIT, DRIVER_A_WEEK_LIMIT - worked.get(driver_id, datetime.timedelta())))
+            for i in range(num_drivers_b):
+                driver_id = f'B{i+1}'
+                limits[driver_id] = max(datetime.timedelta(), min(DRIVER_B_WORK_LIMIT, DRIVER_B_WEEK_LIMIT - worked.get(driver_id, datetime.timedelta())))
+            for driver_id, end_time in last_end.items():
+                start_times[driver_id] = max(day_start, end_time + DRIVER_REST)
+
+        timetable = [(day_start + datetime.timedelta(minutes=offset), route_time)
+                     for offset, route_time in templates[is_weekend(day)]]
+        schedule = solve_interval_schedule(timetable, num_drivers_a, num_drivers_b, day, limits, start_times)
+        for driver in schedule.drivers:
+            worked[driver.id] = worked.get(driver.id, datetime.timedelta()) + driver.total_work_time
+            last_end[driver.id] = max(end for start, end, kind in driver.schedule)
+        days.append((day, schedule))
+    return days
+
+
+def plan_days_task(task):
+    return plan_days(*task)
+
+
+def plan_date_range(start_date, end_date, num_buses, num_drivers_a, num_drivers_b, seed=None, workers=1, carry_over=True):
+    dates = [start_date + datetime.timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    if not dates:
+        return MultiDaySchedule()
+
+    # Один шаблон рейсов на каждый тип дня
+    rng = random.Random(seed if seed is not None else random.getrandbits(64))
+    templates = {}
+    for day in dates:
+        if is_weekend(day) not in templates:
+            random.seed(rng.getrandbits(64))
+            templates[is_weekend(day)] = timetable_template(num_buses, day)
+
+    groups = [dates] if carry_over else [[day] for day in dates]
+
+    tasks = [(group, num_buses, num_drivers_a, num_drivers_b, templates, carry_over) for group in groups]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            planned = list(pool.map(plan_days_task, tasks))
+    else:
+        planned = [plan_days_task(task) for task in tasks]
+    return MultiDaySchedule(day for group in planned for day in group)
+
+
+#  Перепланирование при изменениях в течение дня 
+# Маршруты, начавшиеся до current_time, и маршруты, которых изменение не касается,
+# остаются за прежними водителями. Новые водители ищутся только для затронутых
+# будущих маршрутов: сначала прежний водитель (если он ещё может), затем
+# остальные (сначала тип A) без пересечений по времени, в пределах смены и с
+# перерывами по правилам пула водителей: длинный перерыв типа B всегда, обед
+# типа A - при lunches=True (так строит расписание интервальный алгоритм).
+# Исходное расписание не меняется - возвращается новое и разница назначений.
+class ChangeEvent:
+    DRIVER_REMOVED = 'driver_removed'
+    BUS_REMOVED = 'bus_removed'
+    BUS_ADDED = 'bus_added'
+    ROUTE_DELAYED = 'route_delayed'
+
+    def __init__(self, kind, driver_id=None, route_index=None, delay_minutes=0):
+        self.kind = kind
+        self.driver_id = driver_id
+        self.route_index = route_index
+        self.delay_minutes = delay_minutes
+
+    def __repr__(self):
+        return f"ChangeEvent(kind={self.kind}, driver_id={self.driver_id}, route_index={self.route_index}, delay_minutes={self.delay_minutes})"
+
+
+# Рабочий день каждого водителя строится заново по schedule.routes: у потомков
+# crossover/mutate маршруты и списки событий водителей могут не совпадать.
+# Из событий водителя берутся только перерывы (у типа B они входят в рабочее время).
+def _driver_timelines(schedule):
+    drivers = []
+    drivers_by_id = {}
+    for driver in schedule.drivers:
+        if driver.id in drivers_by_id:
+            continue
+        copy = Driver(driver.type, driver.id)
+        for start_time, end_time, kind in driver.schedule:
+            if kind != 'route':
+                copy.schedule.append((start_time, end_time, kind))
+                copy.last_break = max(copy.last_break, end_time)
+                if copy.type == 'B':
+                    copy.total_work_time += end_time - start_time
+        drivers.append(copy)
+        drivers_by_id[copy.id] = copy
+    for route in schedule.routes:
+        driver = drivers_by_id.get(route.driver_id)
+        if driver is not None:
+            driver.schedule.append((route.start_time, route.end_time, 'route'))
+            driver.total_work_time += route.end_time - route.start_time
+    for driver in drivers:
+        driver.schedule.sort()
+    return drivers, drivers_by_id
+
+
+# Сколько маршрутов водитель взял бы в нарушение правил пула (needs_lunch,
+# needs_long_break): события проходятся по времени, как их выдавал бы пул
+def _rule_violations(driver_type, events, lunches):
+    state = Driver(driver_type, None)
+    violations = 0
+    for start_time, end_time, kind in events:
+        if kind == 'route':
+            if (lunches and needs_lunch(state)) or needs_long_break(state, start_time):
+                violations += 1
+            state.total_work_time += end_time - start_time
+        else:
+            state.last_break = end_time
+            if driver_type == 'B':
+                state.total_work_time += end_time - start_time
+    return violations
+
+
+# Маршрут можно дать водителю, если он свободен, укладывается в смену и не
+# добавляет нарушений правил перерывов (у потомков ГА они могут уже быть)
+def _driver_can_take(driver, start_time, end_time, lunches=False):
+    limit = DRIVER_A_WORK_LIMIT if driver.type == 'A' else DRIVER_B_WORK_LIMIT
+    if driver.total_work_time + (end_time - start_time) > limit:
+        return False
+    for event_start, event_end, kind in driver.schedule:
+        if event_start < end_time and start_time < event_end:
+            return False
+    events = list(driver.schedule)
+    bisect.insort(events, (start_time, end_time, 'route'))
+    return _rule_violations(driver.type, events, lunches) <= _rule_violations(driver.type, driver.schedule, lunches)
+
+
+def repair_schedule(schedule, event, current_time, lunches=False):
+    drivers, drivers_by_id = _driver_timelines(schedule)
+    # Кандидаты на новые маршруты: сначала тип A, затем B, в исходном порядке
+    candidates = sorted(drivers, key=lambda driver: 0 if driver.type == 'A' else 1)
+    unavailable = set()
+    routes = [[route.start_time, route.end_time, route.driver_id] for route in schedule.routes]
+    pending = []   # (индекс маршрута, прежний водитель)
+    diff = {'reassigned': [], 'added': [], 'removed': [], 'unassigned': []}
+
+    def release(index):
+        start_time, end_time, driver_id = routes[index]
+        driver = drivers_by_id.get(driver_id)
+        if driver is not None:
+            driver.schedule.remove((start_time, end_time, 'route'))
+            driver.total_work_time -= end_time - start_time
+        routes[index][2] = None
+        return driver_id
+
+    def future_waves():
+        waves = OrderedDict()
+        for index, (start_time, end_time, driver_id) in enumerate(routes):
+            if start_time >= current_time:
+                waves.setdefault(start_time, []).append(index)
+        return waves
+
+    if event.kind == ChangeEvent.DRIVER_REMOVED:
+        if event.driver_id not in drivers_by_id:
+            raise ValueError(f"Нет водителя {event.driver_id}")
+        unavailable.add(event.driver_id)
+        for index, (start_time, end_time, driver_id) in enumerate(routes):
+            if driver_id == event.driver_id and start_time >= current_time:
+                pending.append((index, release(index)))
+
+    elif event.kind == ChangeEvent.BUS_REMOVED:
+        # В каждой будущей волне отправлений становится на один рейс меньше
+        removed = set()
+        for start_time, indexes in future_waves().items():
+            index = indexes[-1]
+            driver_id = release(index)
+            diff['removed'].append((routes[index][0], routes[index][1], driver_id))
+            removed.add(index)
+        routes = [route for index, route in enumerate(routes) if index not in removed]
+
+    elif event.kind == ChangeEvent.BUS_ADDED:
+        # В каждую будущую волну добавляется рейс той же длительности
+        for start_time, indexes in future_waves().items():
+            end_time = routes[indexes[0]][1]
+            routes.append([start_time, end_time, None])
+            pending.append((len(routes) - 1, None))
+
+    elif event.kind == ChangeEvent.ROUTE_DELAYED:
+        if event.route_index is None or not 0 <= event.route_index < len(routes):
+            raise ValueError(f"Нет маршрута с номером {event.route_index}")
+        route = routes[event.route_index]
+        if route[0] < current_time:
+            raise ValueError("Маршрут уже начался")
+        previous_driver = release(event.route_index)
+        delay = datetime.timedelta(minutes=event.delay_minutes)
+        route[0] += delay
+        route[1] += delay
+        pending.append((event.route_index, previous_driver))
+
+    else:
+        raise ValueError(f"Неизвестное изменение: {event.kind}")
+
+    for index, previous_driver in sorted(pending, key=lambda item: routes[item[0]][0]):
+        start_time, end_time, driver_id = routes[index]
+        chosen = None
+        previous = drivers_by_id.get(previous_driver)
+        if previous is not None and previous.id not in unavailable and _driver_can_take(previous, start_time, end_time, lunches):
+            chosen = previous
+        else:
+            for driver in candidates:
+                if driver.id not in unavailable and _driver_can_take(driver, start_time, end_time, lunches):
+                    chosen = driver
+                    break
+        if chosen is None:
+            diff['unassigned'].append((start_time, end_time, previous_driver))
+            continue
+        routes[index][2] = chosen.id
+        bisect.insort(chosen.schedule, (start_time, end_time, 'route'))
+        chosen.total_work_time += end_time - start_time
+        if previous_driver is None:
+            diff['added'].append((start_time, end_time, chosen.id))
+        elif previous_driver != chosen.id:
+            diff['reassigned'].append((start_time, end_time, previous_driver, chosen.id))
+
+    repaired = Schedule()
+    for start_time, end_time, driver_id in routes:
+        if driver_id is not None:
+            repaired.routes.append(Route(start_time, (end_time - start_time) // datetime.timedelta(minutes=1), driver_id))
+    repaired.drivers.extend(drivers)
+    return repaired, diff
+
+
 #  Функция оценки качества расписания для генетического алгоритма 
 def fitness(schedule):
+    if schedule._fitness is not None:
+        FITNESS_CACHE_STATS['hits'] += 1
+        return schedule._fitness
+    FITNESS_CACHE_STATS['misses'] += 1
     total_routes, peak_routes, unique_drivers = schedule.calculate_metrics()
-    return  total_routes - unique_drivers*0.1
+    schedule._fitness = total_routes - unique_drivers*0.1
+    return schedule._fitness
+
+
+#  Пакетный расчёт метрик для всей популяции (NumPy) 
+# Время начала всех маршрутов всех расписаний собирается в один массив секунд
+# от полуночи, маска часа пик считается за один проход, результаты по
+# расписаниям складываются через bincount. Результат совпадает с calculate_metrics.
+# Время начала приходится собирать из datetime по одному маршруту, поэтому этот
+# путь не быстрее calculate_metrics.
+def _time_to_seconds(time):
+    return time.hour * 3600 + time.minute * 60 + time.second
+
+
+def _population_counts(population):
+    import numpy as np
+
+    total_routes = np.fromiter((len(schedule.routes) for schedule in population), dtype=np.int64, count=len(population))
+    unique_drivers = np.fromiter((len(schedule.drivers) for schedule in population), dtype=np.int64, count=len(population))
+    return total_routes, unique_drivers
+
+
+def calculate_population_metrics(population):
+    import numpy as np
+
+    count = len(population)
+    total_routes, unique_drivers = _population_counts(population)
+    start_chunks = []
+    for schedule in population:
+        start_chunks.append(np.fromiter((_time_to_seconds(route.start_time) for route in schedule.routes),
+                                        dtype=np.int64, count=len(schedule.routes)))
+
+    starts = np.concatenate(start_chunks) if start_chunks else np.empty(0, dtype=np.int64)
+    owners = np.repeat(np.arange(count), total_routes)
+    peak_mask = (
+        ((starts >= _time_to_seconds(PEAK_HOURS_START_1)) & (starts < _time_to_seconds(PEAK_HOURS_END_1))) |
+        ((starts >= _time_to_seconds(PEAK_HOURS_START_2)) & (starts < _time_to_seconds(PEAK_HOURS_END_2)))
+    )
+    peak_routes = np.bincount(owners[peak_mask], minlength=count).astype(np.int64)
+    fitness_values = total_routes - unique_drivers * 0.1
+    return total_routes, peak_routes, unique_drivers, fitness_values
+
+
+#  Оценка популяции через пакетный расчёт (результаты сохраняются в кэш расписаний) 
+# Оценке нужны только число маршрутов и водителей, поэтому маршруты не
+# перебираются; маршруты в час пик досчитываются calculate_metrics по запросу.
+def evaluate_population_vectorized(population):
+    pending = [schedule for schedule in population if schedule._fitness is None]
+    if pending:
+        total_routes, unique_drivers = _population_counts(pending)
+        for schedule, value in zip(pending, (total_routes - unique_drivers * 0.1).tolist()):
+            schedule._fitness = value
+    FITNESS_CACHE_STATS['hits'] += len(population) - len(pending)
+    FITNESS_CACHE_STATS['misses'] += len(pending)
+    return [schedule._fitness for schedule in population]
+
+
+#  Моделирование пассажиропотока (NumPy) 
+# За день приходит в среднем PASSENGER_FLOW пассажиров: в будни доля
+# PEAK_PASSENGER_PERCENT - в окна часа пик, остальные равномерно по дню, в
+# выходные - равномерно. Приход по минутам - пуассоновский, DEMAND_REPLICATIONS
+# реализаций (прогонов Монте-Карло) с фиксированным зерном, общих для всех
+# расписаний, поэтому оценка детерминирована и расписания сравниваются на одних
+# и тех же пассажирах. Пассажиры, пришедшие до минуты отправления, садятся в
+# автобусы этой минуты (до BUS_CAPACITY в каждый) в порядке очереди; кто не уехал
+# до полуночи, считается необслуженным. Вся популяция считается одним проходом
+# по общим минутам отправлений, массивы имеют размер (расписания, реализации).
+BUS_CAPACITY = 50
+DEMAND_REPLICATIONS = 32
+DEMAND_SEED = 2024
+DEMAND_WAIT_WEIGHT = 1.0
+SERVICE_DAY_MINUTES = 24 * 60 - SHIFT_START_MINUTE  # от начала смены до полуночи
+
+_demand_arrivals = {}
+
+
+def demand_arrival_rates(weekend):
+    import numpy as np
+
+    minutes = np.arange(SERVICE_DAY_MINUTES) + SHIFT_START_MINUTE
+    peak = np.zeros(SERVICE_DAY_MINUTES, dtype=bool)
+    if not weekend:
+        for window_start, window_end in PEAK_WINDOWS_MINUTES:
+            peak |= (minutes >= window_start) & (minutes < window_end)
+    rates = np.full(SERVICE_DAY_MINUTES, PASSENGER_FLOW / SERVICE_DAY_MINUTES)
+    if peak.any():
+        rates[peak] = PASSENGER_FLOW * PEAK_PASSENGER_PERCENT / peak.sum()
+        rates[~peak] = PASSENGER_FLOW * (1 - PEAK_PASSENGER_PERCENT) / (~peak).sum()
+    return rates
+
+
+# Накопленные суммы прихода: сколько пассажиров пришло до минуты t и сумма их минут прихода
+def demand_arrivals(weekend, replications=DEMAND_REPLICATIONS):
+    import numpy as np
+
+    key = (weekend, replications, PASSENGER_FLOW, PEAK_PASSENGER_PERCENT)
+    if key not in _demand_arrivals:
+        rng = np.random.default_rng(DEMAND_SEED + int(weekend))
+        arrivals = rng.poisson(demand_arrival_rates(weekend), size=(replications, SERVICE_DAY_MINUTES))
+        counts = np.zeros((replications, SERVICE_DAY_MINUTES + 1), dtype=np.int64)
+        minute_sums = np.zeros((replications, SERVICE_DAY_MINUTES + 1), dtype=np.int64)
+        np.cumsum(arrivals, axis=1, out=counts[:, 1:])
+        np.cumsum(arrivals * np.arange(SERVICE_DAY_MINUTES), axis=1, out=minute_sums[:, 1:])
+        _demand_arrivals[key] = (counts, minute_sums)
+    return _demand_arrivals[key]
+
+
+def _departure_minutes(schedule, current_date):
+    import numpy as np
+
+    base_time = datetime.datetime.combine(current_date, SHIFT_START_TIME)
+    minute = datetime.timedelta(minutes=1)
+    return np.fromiter(((route.start_time - base_time) // minute for route in schedule.routes),
+                       dtype=np.int64, count=len(schedule.routes))
+
+
+# Возвращает для каждого расписания средние по реализациям: ожидание (минут на
+# пассажира), загрузку (доля мест), число необслуженных и перевезённых пассажиров
+def simulate_demand(population, current_date, replications=DEMAND_REPLICATIONS):
+    import numpy as np
+
+    counts, minute_sums = demand_arrivals(is_weekend(current_date), replications)
+    count = len(population)
+    departures = [np.clip(_departure_minutes(schedule, current_date), 0, SERVICE_DAY_MINUTES - 1) for schedule in population]
+    routes = np.array([len(minutes) for minutes in departures], dtype=np.int64)
+    all_minutes = np.concatenate(departures) if departures else np.empty(0, dtype=np.int64)
+    event_minutes = np.unique(all_minutes)
+    # Места по (расписание, минута отправления)
+    capacity = np.zeros((count, len(event_minutes)), dtype=np.int64)
+    owners = np.repeat(np.arange(count), routes)
+    np.add.at(capacity, (owners, np.searchsorted(event_minutes, all_minutes)), BUS_CAPACITY)
+
+    waiting = np.zeros((count, replications), dtype=np.int64)
+    boarded = np.zeros((count, replications), dtype=np.int64)
+    wait_minutes = np.zeros((count, replications), dtype=np.int64)
+    previous = 0
+    for index, minute in enumerate(np.append(event_minutes, SERVICE_DAY_MINUTES).tolist()):
+        arrived = counts[:, minute] - counts[:, previous]
+        # Ожидание уже стоящих в очереди и пришедших с прошлого отправления
+        wait_minutes += waiting * (minute - previous) + (arrived * minute - (minute_sums[:, minute] - minute_sums[:, previous]))
+        waiting += arrived
+        if index < len(event_minutes):
+            seats = np.minimum(waiting, capacity[:, index, None])
+            waiting -= seats
+            boarded += seats
+        previous = minute
+
+    total = counts[:, SERVICE_DAY_MINUTES]
+    mean_wait = (wait_minutes / np.maximum(total, 1)).mean(axis=1)
+    load = (boarded / np.maximum(routes * BUS_CAPACITY, 1)[:, None]).mean(axis=1)
+    return mean_wait, load, waiting.mean(axis=1), boarded.mean(axis=1)
+
+
+# Оценка по пассажиропотоку: процент перевезённых минус ожидание (минуты с весом
+# DEMAND_WAIT_WEIGHT) минус 0.1 за водителя, как в fitness
+def demand_fitness_values(population, current_date, replications=DEMAND_REPLICATIONS):
+    import numpy as np
+
+    mean_wait, load, unserved, served = simulate_demand(population, current_date, replications)
+    counts, minute_sums = demand_arrivals(is_weekend(current_date), replications)
+    drivers = np.array([len(schedule.drivers) for schedule in population])
+    return 100 * served / counts[:, SERVICE_DAY_MINUTES].mean() - DEMAND_WAIT_WEIGHT * mean_wait - 0.1 * drivers
+
+
+# Оценка хранится в своей ячейке кэша (_demand_fitness), fitness() её не видит
+def evaluate_population_demand(population, current_date):
+    pending = [schedule for schedule in population if schedule._demand_fitness is None]
+    if pending:
+        for schedule, value in zip(pending, demand_fitness_values(pending, current_date).tolist()):
+            schedule._demand_fitness = value
+    FITNESS_CACHE_STATS['hits'] += len(population) - len(pending)
+    FITNESS_CACHE_STATS['misses'] += len(pending)
+    return [schedule._demand_fitness for schedule in population]
+
+
+def make_demand_evaluator(current_date):
+    return lambda population: evaluate_population_demand(population, current_date)
+
+
+# Оценка для генетического алгоритма: по пассажиропотоку, пакетная (NumPy) или fitness (None)
+def make_ga_evaluator(current_date, vectorized=False, demand=False):
+    if demand:
+        return make_demand_evaluator(current_date)
+    return evaluate_population_vectorized if vectorized else None
+
+
+def demand_report(schedule, current_date):
+    mean_wait, load, unserved, served = simulate_demand([schedule], current_date)
+    return {'mean_wait': float(mean_wait[0]), 'load': float(load[0]),
+            'unserved': float(unserved[0]), 'served': float(served[0])}
 
 
 #  Функция скрещивания расписаний для генетического алгоритма 
+# Потомок разделяет с родителями нетронутые блоки маршрутов и водителей
+# (родители-списки оборачиваются в геномы только здесь и сами не меняются)
 def crossover(schedule1, schedule2):
-    split_point = random.randint(0, min(len(schedule1.routes), len(schedule2.routes)))
+    routes1, routes2 = as_genome(schedule1.routes), as_genome(schedule2.routes)
+    split_point = random.randint(0, min(len(routes1), len(routes2)))
     child_schedule = Schedule()
-    child_schedule.routes = schedule1.routes[:split_point] + schedule2.routes[split_point:]
+    child_schedule.routes = routes1.splice(split_point, routes2)
 
-    split_point = random.randint(0, min(len(schedule1.drivers), len(schedule2.drivers)))
-    child_schedule.drivers = schedule1.drivers[:split_point] + schedule2.drivers[split_point:]
+    drivers1, drivers2 = as_genome(schedule1.drivers), as_genome(schedule2.drivers)
+    split_point = random.randint(0, min(len(drivers1), len(drivers2)))
+    child_schedule.drivers = drivers1.splice(split_point, drivers2)
     return child_schedule
 
 
 #  Функция мутации расписания для генетического алгоритма 
+# Исходное расписание не меняется: при мутации возвращается новое, в котором
+# заменены только изменённый маршрут и водитель (копия с новым типом)
 def mutate(schedule):
     if random.random() < MUTATION_RATE:
-      if schedule.routes:
-        index_route_mutate = random.randint(0, len(schedule.routes)-1)
-        new_start_time = schedule.routes[index_route_mutate].start_time + datetime.timedelta(minutes=random.randint(-30,30))
+      mutated = Schedule()
+      mutated.routes = as_genome(schedule.routes)
+      mutated.drivers = as_genome(schedule.drivers)
+      routes = mutated.routes
+      if mutated.routes:
+        index_route_mutate = random.randint(0, len(mutated.routes)-1)
+        new_start_time = mutated.routes[index_route_mutate].start_time + datetime.timedelta(minutes=random.randint(-30,30))
         if new_start_time > datetime.datetime.combine(datetime.date.min, SHIFT_START_TIME) and new_start_time < datetime.datetime.combine(datetime.date.min, SHIFT_END_TIME) + datetime.timedelta(days=1):
-            schedule.routes[index_route_mutate] = Route(new_start_time, random.randint(ROUTE_TIME_MIN_MINUTES, ROUTE_TIME_MAX_MINUTES), schedule.routes[index_route_mutate].driver_id)
-      if schedule.drivers:
-        index_driver_mutate = random.randint(0, len(schedule.drivers) - 1)
-        schedule.drivers[index_driver_mutate].type = random.choice(['A', 'B'])
+            new_route = Route(new_start_time, random.randint(ROUTE_TIME_MIN_MINUTES, ROUTE_TIME_MAX_MINUTES), mutated.routes[index_route_mutate].driver_id)
+            mutated.routes = mutated.routes.replace(index_route_mutate, new_route)
+      if mutated.drivers:
+        index_driver_mutate = random.randint(0, len(mutated.drivers) - 1)
+        driver = mutated.drivers[index_driver_mutate]
+        mutated.drivers = mutated.drivers.replace(index_driver_mutate, driver.with_type(random.choice(['A', 'B'])))
+      # Тип водителя и маршруты на метрики влияют только через маршруты;
+      # если маршрут не изменился, сохранённые метрики остаются верными
+      if mutated.routes is routes:
+          mutated._metrics = schedule._metrics
+          mutated._fitness = schedule._fitness
+          mutated._demand_fitness = schedule._demand_fitness
+      return mutated
     return schedule
 
 
-#  Генетический алгоритм 
-def genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, current_date):
-    population = [generate_random_schedule(num_buses, num_drivers_a, num_drivers_b, current_date) for _ in range(POPULATION_SIZE)]
+#  Оценки популяции: evaluate(популяция) или, по умолчанию, fitness каждого расписания 
+def population_scores(population, evaluate=None):
+    return evaluate(population) if evaluate else [fitness(schedule) for schedule in population]
+
 
-    for generation in range(GENERATIONS):
-        population.sort(key=fitness, reverse=True)
-        parents = population[:POPULATION_SIZE // 2]
+#  Ранжирование популяции по оценкам (сортировка устойчивая, как population.sort) 
+def rank_population(population, evaluate=None):
+    scores = population_scores(population, evaluate)
+    order = sorted(range(len(population)), key=scores.__getitem__, reverse=True)
+    return [population[i] for i in order]
+
+
+#  Телеметрия генетического алгоритма 
+# Собирает время фаз (initialization, fitness_sort, selection, crossover, mutation)
+# и для каждого поколения - лучшую, среднюю и худшую оценку, разнообразие
+# (доля различных геномов) и число недопустимых расписаний. Для своих
+# наблюдателей достаточно переопределить on_generation(record).
+# export_trace пишет файл в формате Chrome Trace Event (chrome://tracing, Perfetto).
+class GATelemetry:
+    def __init__(self):
+        self.phase_totals = {}
+        self.generations = []
+        self._generation_phases = {}
+        self._generation_start = None
+        self._origin = time.perf_counter()
+        self._events = []
+
+    def timed(self, phase, func):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add_phase(phase, time.perf_counter() - started)
+        return wrapper
+
+    def add_phase(self, phase, seconds, started=None):
+        self.phase_totals[phase] = self.phase_totals.get(phase, 0.0) + seconds
+        self._generation_phases[phase] = self._generation_phases.get(phase, 0.0) + seconds
+        if started is not None:
+            self._add_event(phase, started, seconds)
+
+    def start_generation(self):
+        self._generation_start = time.perf_counter()
+        self._generation_phases = {}
+
+    def end_generation(self, generation, population, evaluate=None):
+        finished = time.perf_counter()
+        scores = population_scores(population, evaluate)
+        record = {
+            'generation': generation,
+            'seconds': finished - self._generation_start,
+            'phases': self._generation_phases,
+            'best': max(scores),
+            'mean': sum(scores) / len(scores),
+            'worst': min(scores),
+            'diversity': len({schedule_signature(schedule) for schedule in population}) / len(population),
+            'infeasible': sum(1 for schedule in population if not is_feasible(schedule)),
+        }
+        self.generations.append(record)
+        self._add_event(f"generation {generation}", self._generation_start, record['seconds'], record['phases'])
+        self._events.append({'name': 'fitness', 'ph': 'C', 'pid': 1, 'tid': 1,
+                             'ts': (finished - self._origin) * 1e6,
+                             'args': {'best': record['best'], 'mean': record['mean'], 'worst': record['worst']}})
+        self._events.append({'name': 'population', 'ph': 'C', 'pid': 1, 'tid': 1,
+                             'ts': (finished - self._origin) * 1e6,
+                             'args': {'diversity': record['diversity'], 'infeasible': record['infeasible']}})
+        self._generation_phases = {}
+        self.on_generation(record)
+
+    def on_generation(self, record):
+        pass
+
+    def _add_event(self, name, started, seconds, args=None):
+        self._events.append({'name': name, 'ph': 'X', 'pid': 1, 'tid': 1,
+                             'ts': (started - self._origin) * 1e6, 'dur': seconds * 1e6, 'args': args or {}})
+
+    def summary(self):
+        return dict(sorted(self.phase_totals.items(), key=lambda item: item[1], reverse=True))
+
+    def export_trace(self, filename):
+        with open(filename, 'w', encoding='utf-8') as trace_file:
+            json.dump({'traceEvents': self._events, 'displayTimeUnit': 'ms',
+                       'otherData': {'phase_totals': self.phase_totals, 'generations': self.generations}},
+                      trace_file, ensure_ascii=False)
+
+
+# Отпечаток генома для оценки разнообразия популяции
+def schedule_signature(schedule):
+    return hash((tuple((route.start_time, route.end_time, route.driver_id) for route in schedule.routes),
+                 tuple((driver.id, driver.type) for driver in schedule.drivers)))
+
+
+# Допустимость: каждый маршрут назначен водителю из расписания, маршруты одного
+# водителя не пересекаются и укладываются в его смену (8 ч для A, 12 ч для B)
+def is_feasible(schedule):
+    drivers = {driver.id: driver for driver in schedule.drivers}
+    routes_by_driver = {}
+    for route in schedule.routes:
+        if route.driver_id not in drivers:
+            return False
+        routes_by_driver.setdefault(route.driver_id, []).append((route.start_time, route.end_time))
+    for driver_id, intervals in routes_by_driver.items():
+        intervals.sort()
+        for (start, end), (next_start, next_end) in zip(intervals, intervals[1:]):
+            if next_start < end:
+                return False
+        limit = DRIVER_A_WORK_LIMIT if drivers[driver_id].type == 'A' else DRIVER_B_WORK_LIMIT
+        if sum((end - start for start, end in intervals), datetime.timedelta()) > limit:
+            return False
+    return True
+
+
+#  Пошаговая эволюция: после каждого поколения отдаёт (номер, отсортированная популяция) 
+# telemetry (GATelemetry) получает время фаз и статистику поколений; без неё
+# используются исходные функции без обёрток, так что замеры ничего не стоят
+def iterate_population(population, generations, population_size=None, evaluate=None, telemetry=None):
+    if population_size is None:
+        population_size = POPULATION_SIZE
+    rank, select, cross, mut = rank_population, select_parents, crossover, mutate
+    if telemetry is not None:
+        rank = telemetry.timed('fitness_sort', rank_population)
+        select = telemetry.timed('selection', select_parents)
+        cross = telemetry.timed('crossover', crossover)
+        mut = telemetry.timed('mutation', mutate)
+
+    for generation in range(generations):
+        if telemetry is not None:
+            telemetry.start_generation()
+        population = rank(population, evaluate)
+        parents = select(population, population_size)
 
         offspring = []
         for i in range(0, len(parents), 2):
             if i+1 < len(parents):
-                child1 = crossover(parents[i], parents[i+1])
-                child2 = crossover(parents[i+1], parents[i])
-                offspring.append(mutate(child1))
-                offspring.append(mutate(child2))
+                child1 = cross(parents[i], parents[i+1])
+                child2 = cross(parents[i+1], parents[i])
+                offspring.append(mut(child1))
+                offspring.append(mut(child2))
             else:
-                 offspring.append(mutate(parents[i]))
+                 offspring.append(mut(parents[i]))
 
         population = parents + offspring
-        population.sort(key=fitness, reverse=True)
-        population = population[:POPULATION_SIZE]
+        population = rank(population, evaluate)
+        population = population[:population_size]
+
+        if telemetry is not None:
+            telemetry.end_generation(generation + 1, population, evaluate)
+        yield generation + 1, population
+
+
+#  Отбор родителей: лучшая половина отсортированной популяции 
+def select_parents(population, population_size):
+    return population[:population_size // 2]
+
+
+#  Эволюция популяции заданное число поколений 
+# on_generation(номер, популяция) вызывается после каждого поколения;
+# cancel_event (threading.Event) и should_stop(номер, популяция) останавливают
+# эволюцию между поколениями
+def evolve_population(population, generations, population_size=None, evaluate=None,
+                      on_generation=None, cancel_event=None, should_stop=None, telemetry=None):
+    for generation, population in iterate_population(population, generations, population_size, evaluate, telemetry):
+        if on_generation is not None:
+            on_generation(generation, population)
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        if should_stop is not None and should_stop(generation, population):
+            break
+
+    return population
+
+
+#  Критерии остановки: бюджет времени (секунды), число поколений без улучшения, целевая оценка 
+# Время отсчитывается от создания правила, проверка идёт между поколениями
+def make_stopping_rule(time_budget=None, stall_generations=None, target_fitness=None, evaluate=None):
+    if time_budget is None and stall_generations is None and target_fitness is None:
+        return None
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    state = {'best': None, 'stall': 0}
+
+    def should_stop(generation, population):
+        best = max(population_scores(population, evaluate))
+        if target_fitness is not None and best >= target_fitness:
+            return True
+        if stall_generations is not None:
+            if state['best'] is None or best > state['best']:
+                state['best'] = best
+                state['stall'] = 0
+            else:
+                state['stall'] += 1
+                if state['stall'] >= stall_generations:
+                    return True
+        return deadline is not None and time.perf_counter() >= deadline
+
+    return should_stop
+
+
+#  Передача прогресса: номер поколения, лучшая и средняя оценка 
+def report_progress(progress, generation, population, evaluate=None):
+    scores = population_scores(population, evaluate)
+    progress(generation, max(scores), sum(scores) / len(scores))
+
+
+#  Задачи для процессов-исполнителей (функции верхнего уровня, чтобы их можно было передать в пул) 
+def generate_seeded_schedule(task):
+    seed, num_buses, num_drivers_a, num_drivers_b, current_date, departures = task
+    random.seed(seed)
+    return generate_random_schedule(num_buses, num_drivers_a, num_drivers_b, current_date, departures)
+
+
+def evolve_island(task):
+    seed, population, generations, vectorized, demand_date = task
+    random.seed(seed)
+    evaluate = make_ga_evaluator(demand_date, vectorized, demand_date is not None)
+    return evolve_population(population, generations, len(population), evaluate=evaluate)
+
+
+#  Ход генетического алгоритма: после каждого поколения (в модели островов - после
+#  каждой эпохи миграции) отдаёт (номер, популяция, отсортированная по оценке) 
+# Каждая задача получает своё зерно из общего генератора, поэтому при
+# фиксированном seed результат не зависит от числа процессов: при workers <= 1
+# те же задачи выполняются в этом процессе. Оценка стоит микросекунды, и
+# пересылать ради неё расписания в пул каждое поколение дороже самой оценки,
+# поэтому в пул уходят только начальная популяция и острова
+def iterate_genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, current_date, seed=None, workers=1, islands=1,
+                              migration_interval=ISLAND_MIGRATION_INTERVAL, vectorized=False, telemetry=None,
+                              demand=False, departures=None, population_size=None, generations=None):
+    population_size = population_size or POPULATION_SIZE
+    generations = generations or GENERATIONS
+    evaluate = make_ga_evaluator(current_date, vectorized, demand)
+    started = time.perf_counter()
+    rng = random.Random(seed if seed is not None else random.getrandbits(64))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    run_tasks = pool.map if pool is not None else map
+    try:
+        tasks = [(rng.getrandbits(64), num_buses, num_drivers_a, num_drivers_b, current_date, departures)
+                 for _ in range(population_size * max(1, islands))]
+        schedules = list(run_tasks(generate_seeded_schedule, tasks))
+        if telemetry is not None:
+            telemetry.add_phase('initialization', time.perf_counter() - started, started)
+
+        if islands <= 1:
+            random.seed(rng.getrandbits(64))
+            yield from iterate_population(schedules, generations, population_size, evaluate, telemetry)
+            return
+
+        # Модель островов: каждый остров эволюционирует отдельно, лучшие особи
+        # раз в migration_interval поколений переходят на соседний остров (по кольцу)
+        island_populations = [schedules[i * population_size:(i + 1) * population_size] for i in range(islands)]
+
+        # Острова работают в других процессах, поэтому телеметрия собирается по эпохам миграции
+        migration_interval = max(1, migration_interval)
+        generation = 0
+        while generation < generations:
+            if telemetry is not None:
+                telemetry.start_generation()
+            epoch = min(migration_interval, generations - generation)
+            tasks = [(rng.getrandbits(64), island, epoch, vectorized, current_date if demand else None)
+                     for island in island_populations]
+            island_populations = list(run_tasks(evolve_island, tasks))
+            generation += epoch
+
+            merged = rank_population([schedule for island in island_populations for schedule in island], evaluate)
+            if telemetry is not None:
+                telemetry.end_generation(generation, merged, evaluate)
+            if generation < generations:
+                migrants = [island[:ISLAND_MIGRATION_SIZE] for island in island_populations]
+                for i in range(islands):
+                    target = island_populations[(i + 1) % islands]
+                    target[len(target) - len(migrants[i]):] = migrants[i]
+            yield generation, merged
+    finally:
+        # Острова в этом процессе меняют общий генератор; после них он
+        # переводится в одно и то же состояние при любом числе процессов
+        if islands > 1:
+            random.seed(rng.getrandbits(64))
+        if pool is not None:
+            pool.shutdown()
+
+
+#  Генетический алгоритм как генератор: после каждого поколения отдаёт (номер, лучшее расписание) 
+# Можно прервать в любой момент и взять последнее полученное расписание.
+# progress(номер, лучшая, средняя оценка) вызывается после каждого поколения;
+# cancel_event (threading.Event) и критерии остановки завершают генератор между поколениями
+def genetic_algorithm_iter(num_buses, num_drivers_a, num_drivers_b, current_date, seed=None, vectorized=False,
+                           time_budget=None, stall_generations=None, target_fitness=None, telemetry=None, demand=False,
+                           departures=None, workers=1, islands=1, migration_interval=ISLAND_MIGRATION_INTERVAL,
+                           progress=None, cancel_event=None, population_size=None, generations=None):
+    evaluate = make_ga_evaluator(current_date, vectorized, demand)
+    should_stop = make_stopping_rule(time_budget, stall_generations, target_fitness, evaluate)
+    steps = iterate_genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, current_date, seed, workers, islands,
+                                      migration_interval, vectorized, telemetry, demand, departures,
+                                      population_size, generations)
+    try:
+        for generation, population in steps:
+            if progress is not None:
+                report_progress(progress, generation, population, evaluate)
+            yield generation, population[0]
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            if should_stop is not None and should_stop(generation, population):
+                return
+    finally:
+        steps.close()
+
+
+#  Генетический алгоритм: лучшее расписание последнего поколения genetic_algorithm_iter 
+def genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, current_date, seed=None, workers=1, islands=1,
+                      migration_interval=ISLAND_MIGRATION_INTERVAL, vectorized=False, progress=None, cancel_event=None,
+                      time_budget=None, stall_generations=None, target_fitness=None, telemetry=None, demand=False,
+                      departures=None, population_size=None, generations=None):
+    best = None
+    for generation, best in genetic_algorithm_iter(num_buses, num_drivers_a, num_drivers_b, current_date, seed, vectorized,
+                                                   time_budget, stall_generations, target_fitness, telemetry, demand,
+                                                   departures, workers, islands, migration_interval, progress, cancel_event,
+                                                   population_size, generations):
+        pass
+    return best
+
+
+#  Результат запуска обоих алгоритмов 
+# Для сравнения водители считаются одинаково во всех столбцах - только те, у
+# кого есть маршрут (прямой и генетический алгоритмы перечисляют всех нанятых)
+def comparison_metrics(schedule):
+    total_routes, peak_routes, unique_drivers = schedule.calculate_metrics()
+    return total_routes, peak_routes, len({route.driver_id for route in schedule.routes})
+
+
+class ScheduleResult:
+    # Нижняя граница числа водителей (max_concurrent_routes по рейсам расчёта)
+    driver_lower_bound = None
+
+    def __init__(self, straight_schedule, genetic_schedule, interval_schedule=None, timings=None, driver_lower_bound=None):
+        self.straight_schedule = straight_schedule
+        self.genetic_schedule = genetic_schedule
+        self.interval_schedule = interval_schedule
+        self.straight_metrics = comparison_metrics(straight_schedule)
+        self.genetic_metrics = comparison_metrics(genetic_schedule)
+        self.interval_metrics = comparison_metrics(interval_schedule) if interval_schedule is not None else None
+        # Время работы каждого алгоритма, секунды
+        self.timings = timings or {}
+        self.driver_lower_bound = driver_lower_bound
+
+    def __repr__(self):
+        return f"ScheduleResult(straight={self.straight_metrics}, genetic={self.genetic_metrics}, interval={self.interval_metrics})"
+
+
+#  Кэш результатов: LRU в памяти и, по желанию, файлы pickle на диске 
+class ScheduleResultCache:
+    def __init__(self, maxsize=RESULT_CACHE_SIZE, cache_dir=None):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Кэш используется и из окна, и из фонового потока расчёта
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '.pkl')
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        if self.cache_dir and os.path.exists(self._path(key)):
+            with open(self._path(key), 'rb') as cache_file:
+                result = pickle.load(cache_file)
+            self._remember(key, result)
+            self.hits += 1
+            return result
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        with self._lock:
+            self._remember(key, result)
+            if self.cache_dir:
+                path = self._path(key)
+                with open(path + '.tmp', 'wb') as cache_file:
+                    pickle.dump(result, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(path + '.tmp', path)
+
+    def _remember(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+SCHEDULE_CACHE = ScheduleResultCache()
+
+
+# Ключ включает всё, от чего зависит результат, в том числе текущие параметры ГА
+def schedule_cache_key(num_buses, num_drivers_a, num_drivers_b, current_date, seed=None, workers=1, islands=1,
+                       migration_interval=ISLAND_MIGRATION_INTERVAL, time_budget=None, stall_generations=None,
+                       target_fitness=None, demand=False):
+    ga_params = (POPULATION_SIZE, GENERATIONS, MUTATION_RATE, workers > 1, islands,
+                 migration_interval if islands > 1 else None, time_budget, stall_generations, target_fitness,
+                 (PASSENGER_FLOW, PEAK_PASSENGER_PERCENT, BUS_CAPACITY, DEMAND_REPLICATIONS) if demand else None)
+    return (num_buses, num_drivers_a, num_drivers_b, current_date, seed, ga_params)
+
+
+def compute_schedule_result(num_buses, num_drivers_a, num_drivers_b, current_date, seed=None, workers=1, islands=1,
+                            migration_interval=ISLAND_MIGRATION_INTERVAL, vectorized=False, progress=None, cancel_event=None,
+                            time_budget=None, stall_generations=None, target_fitness=None, telemetry=None, demand=False):
+    if seed is not None:
+        random.seed(seed)
+    # Один набор рейсов на весь расчёт: все три алгоритма назначают водителей на одни и те же рейсы
+    departures = list(iterate_departures(num_buses, current_date))
+    timings = {}
+    started = time.perf_counter()
+    straight_schedule = create_straight_schedule(num_buses, num_drivers_a, num_drivers_b, current_date, departures)
+    timings['straight'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    genetic_schedule = genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, current_date,
+                                         workers=workers, islands=islands,
+                                         migration_interval=migration_interval, vectorized=vectorized,
+                                         progress=progress, cancel_event=cancel_event, time_budget=time_budget,
+                                         stall_generations=stall_generations, target_fitness=target_fitness,
+                                         telemetry=telemetry, demand=demand, departures=departures)
+    timings['genetic'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    interval_schedule = create_interval_schedule(num_buses, num_drivers_a, num_drivers_b, current_date, departures)
+    timings['interval'] = time.perf_counter() - started
+    driver_lower_bound = max_concurrent_routes(route_timetable(num_buses, current_date, departures))
+    return ScheduleResult(straight_schedule, genetic_schedule, interval_schedule, timings, driver_lower_bound)
+
+
+#  Получение результата из кэша или расчёт (отображение, CSV, график и сохранение используют один результат) 
+def get_schedule_result(num_buses, num_drivers_a, num_drivers_b, current_date, seed=None, workers=1, islands=1,
+                        migration_interval=ISLAND_MIGRATION_INTERVAL, vectorized=False, cache=None,
+                        progress=None, cancel_event=None, time_budget=None, stall_generations=None, target_fitness=None,
+                        telemetry=None, demand=False):
+    if cache is None:
+        cache = SCHEDULE_CACHE
+    key = schedule_cache_key(num_buses, num_drivers_a, num_drivers_b, current_date, seed, workers, islands, migration_interval,
+                             time_budget, stall_generations, target_fitness, demand)
+    result = cache.get(key)
+    if result is None:
+        result = compute_schedule_result(num_buses, num_drivers_a, num_drivers_b, current_date, seed, workers, islands,
+                                         migration_interval, vectorized, progress, cancel_event,
+                                         time_budget, stall_generations, target_fitness, telemetry, demand)
+        # Прерванный расчёт в кэш не попадает
+        if cancel_event is None or not cancel_event.is_set():
+            cache.put(key, result)
+    return result
 
-    return population[0]
 
 #  Запись расписания в CSV-файл 
-def write_schedule_to_csv(straight_schedule, genetic_schedule, filename, current_date):
+def write_schedule_to_csv(straight_schedule, genetic_schedule, filename, current_date, interval_schedule=None):
+    algorithms = [(straight_schedule, "Straight"), (genetic_schedule, "Genetic")]
+    if interval_schedule is not None:
+        algorithms.append((interval_schedule, "Interval"))
+    write_schedules_to_csv(algorithms, filename)
+
+
+# algorithms - список (расписание, название алгоритма)
+def write_schedules_to_csv(algorithms, filename):
     with open(filename, 'w', newline='') as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(['Algorithm', 'Driver ID', 'Schedule'])  # Заголовки
         
-        for schedule, algorithm_name in [(straight_schedule, "Straight"), (genetic_schedule, "Genetic")]:
+        for schedule, algorithm_name in algorithms:
           for driver in schedule.drivers:
-            shifts_text = ""
+            shifts = []
             for start, end, type in driver.schedule:
-              start_datetime = start
-              end_datetime = end
               if type == 'route':
-                  shifts_text += f"Маршрут: {start_datetime.strftime('%Y-%m-%d %H:%M')}-{end_datetime.strftime('%Y-%m-%d %H:%M')}, "
+                  shifts.append(f"Маршрут: {start:%Y-%m-%d %H:%M}-{end:%Y-%m-%d %H:%M}")
               elif type == 'break':
-                  shifts_text += f"Перерыв: {start_datetime.strftime('%Y-%m-%d %H:%M')}-{end_datetime.strftime('%Y-%m-%d %H:%M')}, "
-            shifts_text = shifts_text.rstrip(", ")
-            writer.writerow([algorithm_name, driver.id, shifts_text])
+                  shifts.append(f"Перерыв: {start:%Y-%m-%d %H:%M}-{end:%Y-%m-%d %H:%M}")
+            writer.writerow([algorithm_name, driver.id, ", ".join(shifts)])
+
+#  Потоковая выгрузка событий: одна строка на событие водителя 
+# Поля: algorithm, driver_id, kind ('route'/'break'), start, end. Строки
+# формируются генератором и пишутся блоками по EXPORT_CHUNK_ROWS, так что в
+# памяти никогда не лежит весь документ. Форматы: csv, jsonl, а при наличии
+# pyarrow - parquet и arrow (файл Arrow IPC).
+EXPORT_FIELDS = ['algorithm', 'driver_id', 'kind', 'start', 'end']
+EXPORT_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.parquet': 'parquet', '.arrow': 'arrow'}
+
+
+def iterate_schedule_events(algorithms):
+    for schedule, algorithm_name in algorithms:
+        for driver in schedule.drivers:
+            for start, end, kind in driver.schedule:
+                yield algorithm_name, driver.id, kind, start, end
+
+
+def iterate_chunks(rows, chunk_rows):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_schedule_events(algorithms, filename, export_format=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    if export_format is None:
+        export_format = EXPORT_FORMATS.get(os.path.splitext(filename)[1].lower(), 'csv')
+    chunks = iterate_chunks(iterate_schedule_events(algorithms), chunk_rows)
+    rows_written = 0
+
+    if export_format == 'csv':
+        with open(filename, 'w', newline='', encoding='utf-8') as export_file:
+            writer = csv.writer(export_file)
+            writer.writerow(EXPORT_FIELDS)
+            for chunk in chunks:
+                writer.writerows((algorithm, driver_id, kind, f"{start:%Y-%m-%dT%H:%M}", f"{end:%Y-%m-%dT%H:%M}")
+                                 for algorithm, driver_id, kind, start, end in chunk)
+                export_file.flush()
+                rows_written += len(chunk)
+
+    elif export_format == 'jsonl':
+        with open(filename, 'w', encoding='utf-8') as export_file:
+            for chunk in chunks:
+                export_file.write("".join(
+                    json.dumps({'algorithm': algorithm, 'driver_id': driver_id, 'kind': kind,
+                                'start': f"{start:%Y-%m-%dT%H:%M}", 'end': f"{end:%Y-%m-%dT%H:%M}"}, ensure_ascii=False) + "\n"
+                    for algorithm, driver_id, kind, start, end in chunk))
+                export_file.flush()
+                rows_written += len(chunk)
+
+    elif export_format in ('parquet', 'arrow'):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ValueError(f"Для формата {export_format} нужен пакет pyarrow")
+        schema = pa.schema([('algorithm', pa.string()), ('driver_id', pa.string()), ('kind', pa.string()),
+                            ('start', pa.timestamp('s')), ('end', pa.timestamp('s'))])
+        if export_format == 'parquet':
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(filename, schema)
+            write_chunk = writer.write_table
+        else:
+            import pyarrow.ipc as ipc
+            writer = ipc.new_file(filename, schema)
+            write_chunk = writer.write_table
+        try:
+            for chunk in chunks:
+                columns = list(zip(*chunk))
+                write_chunk(pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                                 schema=schema))
+                rows_written += len(chunk)
+        finally:
+            writer.close()
+
+    else:
+        raise ValueError(f"Неизвестный формат выгрузки: {export_format}")
+
+    return rows_written
+
 
 #  Запись сравнения результатов в CSV-файл 
-def write_comparison_to_csv(straight_metrics, genetic_metrics, filename):
+# driver_lower_bound - сколько водителей нужно как минимум (max_concurrent_routes);
+# строка Drivers Over Bound показывает, насколько алгоритм от него отстоит
+def write_comparison_to_csv(straight_metrics, genetic_metrics, filename, interval_metrics=None, timings=None,
+                            driver_lower_bound=None):
+    columns = [straight_metrics, genetic_metrics]
+    header = ['Metric', 'Straight Algorithm', 'Genetic Algorithm']
+    if interval_metrics is not None:
+        columns.append(interval_metrics)
+        header.append('Interval Algorithm')
     with open(filename, 'w', newline='') as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow(['Metric', 'Straight Algorithm', 'Genetic Algorithm'])
-        writer.writerow(['Total Routes', straight_metrics[0], genetic_metrics[0]])
-        writer.writerow(['Peak Routes', straight_metrics[1], genetic_metrics[1]])
-        writer.writerow(['Unique Drivers', straight_metrics[2], genetic_metrics[2]])
-
-
-def display_comparison_window(straight_schedule, genetic_schedule, straight_metrics, genetic_metrics):
-    
-    comparison_window = tk.Toplevel(root)
-    comparison_window.title("Сравнение алгоритмов")
-    
-    
-    labels = ['Total Routes', 'Peak Routes', 'Unique Drivers']
-    straight_values = straight_metrics
-    genetic_values = genetic_metrics
-
-    fig, axs = plt.subplots(1, 2, figsize=(12, 6))
-
-    bars_straight = axs[0].bar(labels, straight_values, color='skyblue')
-    axs[0].set_title('Прямой алгоритм')
-    axs[0].set_ylabel('Значение')
-    
-    for bar, value in zip(bars_straight, straight_values):
-         axs[0].text(bar.get_x() + bar.get_width()/2, value,
-                    f'{value}',
-                    ha='center', va='bottom')
-   
-
-
-    bars_genetic = axs[1].bar(labels, genetic_values, color='lightcoral')
-    axs[1].set_title('Генетический алгоритм')
-   
-    
-    for bar, value in zip(bars_genetic, genetic_values):
-        axs[1].text(bar.get_x() + bar.get_width()/2, value,
-                   f'{value}',
-                    ha='center', va='bottom')
-
-
-    fig.tight_layout()
-
-    canvas = FigureCanvasTkAgg(fig, master=comparison_window)
-    canvas_widget = canvas.get_tk_widget()
-    canvas_widget.pack()
+        writer.writerow(header)
+        writer.writerow(['Total Routes'] + [metrics[0] for metrics in columns])
+        writer.writerow(['Peak Routes'] + [metrics[1] for metrics in columns])
+        writer.writerow(['Unique Drivers'] + [metrics[2] for metrics in columns])
+        if driver_lower_bound is not None:
+            writer.writerow(['Driver Lower Bound'] + [driver_lower_bound] * len(columns))
+            writer.writerow(['Drivers Over Bound'] + [metrics[2] - driver_lower_bound for metrics in columns])
+        if timings:
+            names = ['straight', 'genetic', 'interval'][:len(columns)]
+            writer.writerow(['Time, s'] + [f"{timings[name]:.3f}" if name in timings else '' for name in names])
+
+
+#  Окно сравнения алгоритмов 
+# Одно окно на всё время работы программы: фигура, оси, столбцы и подписи
+# создаются один раз, а при новом расчёте меняются только их данные. Фигура
+# создаётся через matplotlib.figure.Figure, а не pyplot, поэтому не попадает в
+# глобальный реестр фигур. Закрытие окна его только прячет.
+# Нижняя панель - сходимость ГА: линии лучшей и средней оценки обновляются после
+# каждого поколения перерисовкой одной этой панели поверх сохранённого фона
+# (blit); вся фигура перерисовывается, только когда меняются пределы осей.
+COMPARISON_LABELS = ['Total Routes', 'Peak Routes', 'Unique Drivers']
+COMPARISON_PANELS = [('Прямой алгоритм', 'skyblue'), ('Генетический алгоритм', 'lightcoral'),
+                     ('Интервальный алгоритм', 'lightgreen')]
+comparison_view = None
+
+
+class ComparisonView:
+    def __init__(self, master):
+        import tkinter as tk
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        self.window = tk.Toplevel(master)
+        self.window.title("Сравнение алгоритмов")
+        self.window.protocol("WM_DELETE_WINDOW", self.window.withdraw)
+
+        self.figure = Figure(figsize=(6 * len(COMPARISON_PANELS), 9))
+        grid = self.figure.add_gridspec(2, len(COMPARISON_PANELS))
+        self.panels = []
+        for column, (title, color) in enumerate(COMPARISON_PANELS):
+            ax = self.figure.add_subplot(grid[0, column])
+            ax.set_title(title)
+            bars = ax.bar(COMPARISON_LABELS, [0] * len(COMPARISON_LABELS), color=color)
+            labels = [ax.text(bar.get_x() + bar.get_width()/2, 0, '', ha='center', va='bottom') for bar in bars]
+            self.panels.append((ax, bars, labels))
+        self.panels[0][0].set_ylabel('Значение')
+
+        self.convergence = self.figure.add_subplot(grid[1, :])
+        self.convergence.set_title('Сходимость генетического алгоритма')
+        self.convergence.set_xlabel('Поколение')
+        self.convergence.set_ylabel('Оценка')
+        self.best_line, = self.convergence.plot([], [], color='firebrick', label='Лучшая', animated=True)
+        self.mean_line, = self.convergence.plot([], [], color='steelblue', label='Средняя', animated=True)
+        self.convergence.legend(loc='lower right')
+        self.generations = []
+        self.best = []
+        self.mean = []
+        self.background = None
+
+        self.figure.tight_layout()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.window)
+        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.draw_idle()
+
+    def exists(self):
+        return bool(self.window.winfo_exists())
+
+    def show(self):
+        self.window.deiconify()
+        self.window.lift()
+
+    def set_metrics(self, metrics_list):
+        for (ax, bars, labels), metrics in zip(self.panels, metrics_list):
+            ax.set_visible(metrics is not None)
+            if metrics is None:
+                continue
+            for bar, label, value in zip(bars, labels, metrics):
+                bar.set_height(value)
+                label.set_position((bar.get_x() + bar.get_width()/2, value))
+                label.set_text(f'{value}')
+            ax.set_ylim(0, max(max(metrics) * 1.15, 1))
+        self.canvas.draw_idle()
+
+    def start_run(self, generations):
+        self.generations.clear()
+        self.best.clear()
+        self.mean.clear()
+        self.best_line.set_data([], [])
+        self.mean_line.set_data([], [])
+        self.convergence.set_xlim(0, max(generations, 1))
+        self.convergence.set_ylim(0, 1)
+        self.canvas.draw_idle()
+
+    def add_generation(self, generation, best, mean):
+        self.generations.append(generation)
+        self.best.append(best)
+        self.mean.append(mean)
+        self.best_line.set_data(self.generations, self.best)
+        self.mean_line.set_data(self.generations, self.mean)
+
+        # Выход за пределы осей - полная перерисовка, иначе перерисовываются только линии
+        low, high = self.convergence.get_ylim()
+        values_low, values_high = min(min(self.best), min(self.mean)), max(max(self.best), max(self.mean))
+        resized = False
+        if len(self.generations) == 1 or values_low < low or values_high > high:
+            margin = max((values_high - values_low) * 0.25, 1)
+            self.convergence.set_ylim(values_low - margin, values_high + margin)
+            resized = True
+        if generation > self.convergence.get_xlim()[1]:
+            self.convergence.set_xlim(0, generation * 2)
+            resized = True
+        if resized or self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_lines()
+        self.canvas.blit(self.convergence.bbox)
+
+    def _draw_lines(self):
+        self.convergence.draw_artist(self.mean_line)
+        self.convergence.draw_artist(self.best_line)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.convergence.bbox)
+        self._draw_lines()
+
+
+def get_comparison_view():
+    global comparison_view
+    if comparison_view is None or not comparison_view.exists():
+        comparison_view = ComparisonView(root)
+    return comparison_view
+
+
+def display_comparison_window(straight_schedule, genetic_schedule, straight_metrics, genetic_metrics, interval_metrics=None):
+    view = get_comparison_view()
+    view.set_metrics([straight_metrics, genetic_metrics, interval_metrics])
+    view.show()
 
 #  Отображение расписания в таблице 
-def display_schedule(straight_schedule, genetic_schedule, table, current_date):
-    for item in table.get_children():
-        table.delete(item)
+ALGORITHM_COLORS = {"Прямой": "#e0f7fa", "Генетический": "#ffebee", "Интервальный": "#e8f5e9", "План": "#fff8e1"}
 
-    schedule_data = []
+def display_schedule(straight_schedule, genetic_schedule, table, current_date, interval_schedule=None):
+    algorithms = [(straight_schedule, "Прямой"), (genetic_schedule, "Генетический")]
+    if interval_schedule is not None:
+        algorithms.append((interval_schedule, "Интервальный"))
+    display_schedules(algorithms, table)
+
+
+# algorithms - список (расписание, название алгоритма); подходит и для MultiDaySchedule
+def display_schedules(algorithms, table):
+    table.model.set_schedules(algorithms)
+    table.refresh()
+
+
+#  Модель данных таблицы расписания 
+# Хранит ссылки (алгоритм, водитель), а текст строки считает только для тех
+# строк, которые показываются, и запоминает его. Фильтр и сортировка меняют лишь
+# список индексов видимых строк.
+TABLE_COLUMNS = ("Algorithm", "Driver ID", "Schedule", "Work Time", "Break Time")
+TABLE_HEADINGS = {"Algorithm": "Алгоритм", "Driver ID": "Водитель", "Schedule": "Расписание",
+                  "Work Time": "Время работы", "Break Time": "Время перерыва"}
+TABLE_WIDTHS = {"Algorithm": (100, 'center'), "Driver ID": (80, 'center'), "Schedule": (400, 'w'),
+                "Work Time": (100, 'center'), "Break Time": (100, 'center')}
+ODD_ROW_COLOR = '#f0f0f0'
 
-    for schedule, algorithm_name in [(straight_schedule, "Прямой"), (genetic_schedule, "Генетический")]:
-        for driver in schedule.drivers:
-            driver_schedules = []
-            for start, end, type in driver.schedule:
-                driver_schedules.append((start, end, type))
 
-            shifts_text = ""
+class ScheduleTableModel:
+    def __init__(self):
+        self._schedules = OrderedDict()   # алгоритм -> расписание
+        self._rows = []                   # (алгоритм, водитель)
+        self._view = []                   # индексы строк после фильтра и сортировки
+        self._cache = {}                  # индекс строки -> (значения, минуты работы, минуты перерыва)
+        self.algorithm_filter = None
+        self.type_filter = None
+        self.sort_column = None
+        self.sort_reverse = False
+
+    def __len__(self):
+        return len(self._view)
+
+    def algorithms(self):
+        return list(self._schedules)
+
+    # Новый результат: заменяются только изменившиеся алгоритмы
+    def set_schedules(self, algorithms):
+        names = [name for schedule, name in algorithms]
+        changed = list(self._schedules) != names
+        for schedule, name in algorithms:
+            if self._schedules.get(name) is not schedule:
+                self._schedules[name] = schedule
+                changed = True
+        for name in list(self._schedules):
+            if name not in names:
+                del self._schedules[name]
+        if changed:
+            self._schedules = OrderedDict((name, self._schedules[name]) for name in names)
+            self._rebuild()
+
+    def set_filter(self, algorithm=None, driver_type=None):
+        self.algorithm_filter = algorithm
+        self.type_filter = driver_type
+        self._refresh_view()
+
+    def sort_by(self, column):
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = False
+        self._refresh_view()
+
+    def _rebuild(self):
+        self._rows = [(name, driver) for name, schedule in self._schedules.items() for driver in schedule.drivers]
+        self._cache = {}
+        self._refresh_view()
+
+    def _refresh_view(self):
+        view = [index for index, (name, driver) in enumerate(self._rows)
+                if (self.algorithm_filter is None or name == self.algorithm_filter)
+                and (self.type_filter is None or driver.type == self.type_filter)]
+        if self.sort_column is not None:
+            view.sort(key=self._sort_key, reverse=self.sort_reverse)
+        self._view = view
+
+    def _sort_key(self, index):
+        name, driver = self._rows[index]
+        if self.sort_column == "Algorithm":
+            return name, index
+        if self.sort_column == "Driver ID":
+            number = driver.id[1:]
+            return driver.id[:1], int(number) if number.isdigit() else 0, index
+        values, work_minutes, break_minutes = self._row_data(index)
+        if self.sort_column == "Work Time":
+            return work_minutes, index
+        if self.sort_column == "Break Time":
+            return break_minutes, index
+        return values[2], index
+
+    def _row_data(self, index):
+        data = self._cache.get(index)
+        if data is None:
+            name, driver = self._rows[index]
+            shifts = []
             total_work_time = 0
             total_break_time = 0
-
-            for start, end, type in driver_schedules:
+            for start, end, type in driver.schedule:
                 if type == 'route':
                     total_work_time += (end - start).total_seconds() / 60
-                    shifts_text += f"Маршрут: {start.strftime('%H:%M')}-{end.strftime('%H:%M')}, "
+                    shifts.append(f"Маршрут: {start:%H:%M}-{end:%H:%M}")
                 elif type == 'break':
                     total_break_time += (end - start).total_seconds() / 60
-                    shifts_text += f"Перерыв: {start.strftime('%H:%M')}-{end.strftime('%H:%M')}, "
-
-            shifts_text = shifts_text.rstrip(", ")
-
-            schedule_data.append((algorithm_name, driver.id, shifts_text, f"{int(total_work_time)} мин", f"{int(total_break_time)} мин"))
-
-    table.heading("Algorithm", text="Алгоритм")
-    table.heading("Driver ID", text="Водитель")
-    table.heading("Schedule", text="Расписание")
-    table.heading("Work Time", text="Время работы")
-    table.heading("Break Time", text="Время перерыва")
-    
-    tag_counter = 0
-    for algorithm, driver_id, shifts, work_time, break_time in schedule_data:
-        tag = f"tag{tag_counter}"
-        if algorithm == "Прямой":
-            table.insert("", "end", values=[algorithm, driver_id, shifts, work_time, break_time], tags=(tag,))
-            table.tag_configure(tag, background="#e0f7fa")
+                    shifts.append(f"Перерыв: {start:%H:%M}-{end:%H:%M}")
+            values = (name, driver.id, ", ".join(shifts), f"{int(total_work_time)} мин", f"{int(total_break_time)} мин")
+            data = self._cache[index] = (values, total_work_time, total_break_time)
+        return data
+
+    # Значения строки с номером position в текущем представлении
+    def row(self, position):
+        return self._row_data(self._view[position])[0]
+
+
+#  Виртуальная таблица: в Treeview всегда одно и то же небольшое число строк 
+# При прокрутке меняются только значения этих строк, поэтому время перерисовки
+# не зависит от числа водителей. Теги стилей постоянные: по одному на алгоритм
+# и один для нечётных строк.
+class VirtualScheduleTable:
+    def __init__(self, master, model, visible_rows=20):
+        import tkinter as tk
+        from tkinter import ttk
+
+        self.model = model
+        self.top = 0
+        self.frame = ttk.Frame(master)
+        self.tree = ttk.Treeview(self.frame, columns=TABLE_COLUMNS, show="headings", height=visible_rows)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.yview)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.frame.grid_rowconfigure(0, weight=1)
+        self.frame.grid_columnconfigure(0, weight=1)
+
+        for column in TABLE_COLUMNS:
+            self.tree.heading(column, text=TABLE_HEADINGS[column], command=lambda column=column: self.sort_by(column))
+            width, anchor = TABLE_WIDTHS[column]
+            self.tree.column(column, width=width, anchor=anchor)
+        for name, color in ALGORITHM_COLORS.items():
+            self.tree.tag_configure(name, background=color)
+        self.tree.tag_configure('oddrow', background=ODD_ROW_COLOR)
+
+        self.items = []
+        self._resize_items(visible_rows)
+
+        self.tree.bind('<MouseWheel>', lambda event: self.scroll(-1 if event.delta > 0 else 1))
+        self.tree.bind('<Button-4>', lambda event: self.scroll(-1))
+        self.tree.bind('<Button-5>', lambda event: self.scroll(1))
+        self.tree.bind('<Configure>', self._on_configure)
+
+    def grid(self, **options):
+        self.frame.grid(**options)
+
+    def _resize_items(self, count):
+        while len(self.items) < count:
+            self.items.append(self.tree.insert("", "end", values=("",) * len(TABLE_COLUMNS)))
+        while len(self.items) > count:
+            self.tree.delete(self.items.pop())
+
+    def _on_configure(self, event):
+        from tkinter import ttk
+        row_height = ttk.Style().lookup('Treeview', 'rowheight') or 20
+        count = max(1, (event.height - int(row_height)) // int(row_height))
+        if count != len(self.items):
+            self._resize_items(count)
+            self.refresh()
+
+    def refresh(self):
+        total = len(self.model)
+        page = len(self.items)
+        self.top = max(0, min(self.top, total - page))
+        for offset, item in enumerate(self.items):
+            position = self.top + offset
+            if position < total:
+                values = self.model.row(position)
+                tag = 'oddrow' if position % 2 else values[0]
+                self.tree.item(item, values=values, tags=(tag,))
+            else:
+                self.tree.item(item, values=("",) * len(TABLE_COLUMNS), tags=())
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + page) / total))
         else:
-            table.insert("", "end", values=[algorithm, driver_id, shifts, work_time, break_time], tags=(tag,))
-            table.tag_configure(tag, background="#ffebee")
-        tag_counter += 1
-    
-    table.column("Algorithm", width=100, anchor='center')
-    table.column("Driver ID", width=80, anchor='center')
-    table.column("Schedule", width=400, anchor='w')
-    table.column("Work Time", width=100, anchor='center')
-    table.column("Break Time", width=100, anchor='center')
-
-    for item in table.get_children():
-       if table.index(item) % 2 != 0 :
-         table.item(item,  tags=('oddrow',))
-    table.tag_configure('oddrow', background='#f0f0f0')
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, rows):
+        self.top += rows
+        self.refresh()
+
+    # Команда полосы прокрутки: ('moveto', доля) или ('scroll', n, 'units'|'pages')
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.model))
+        elif args[0] == 'scroll':
+            step = len(self.items) if args[2] == 'pages' else 1
+            self.top += int(args[1]) * step
+        self.refresh()
+
+    def sort_by(self, column):
+        self.model.sort_by(column)
+        self.refresh()
+
+    def set_filter(self, algorithm=None, driver_type=None):
+        self.model.set_filter(algorithm, driver_type)
+        self.top = 0
+        self.refresh()
+
+
+#  Фильтр по алгоритму: только алгоритмы, которые есть в таблице 
+def update_algorithm_filter():
+    algorithms = schedule_table.model.algorithms()
+    algorithm_filter.config(values=["Все"] + algorithms)
+    if algorithm_filter.get() not in ["Все"] + algorithms:
+        algorithm_filter.set("Все")
+        schedule_table.set_filter(None, schedule_table.model.type_filter)
+
+
+#  Отображение готового результата (таблица, метрики, CSV сравнения, график) 
+# Последний показанный результат и его дата: их сохраняет save_schedule_to_file
+last_result = None
+
+def show_schedule_result(result, selected_date):
+    global last_result
+    last_result = (result, selected_date)
+    straight_metrics = result.straight_metrics
+    genetic_metrics = result.genetic_metrics
+    interval_metrics = result.interval_metrics
+
+    display_schedule(result.straight_schedule, result.genetic_schedule, schedule_table, selected_date, result.interval_schedule)
+    update_algorithm_filter()
+
+    text = (f"Прямой: Маршрутов={straight_metrics[0]}, Маршрутов в пик={straight_metrics[1]}, Водителей={straight_metrics[2]} "
+            f"Генетический: Маршрутов={genetic_metrics[0]}, Маршрутов в пик={genetic_metrics[1]}, Водителей={genetic_metrics[2]}")
+    if interval_metrics is not None:
+        text += f" Интервальный: Маршрутов={interval_metrics[0]}, Маршрутов в пик={interval_metrics[1]}, Водителей={interval_metrics[2]}"
+    if result.driver_lower_bound is not None:
+        text += f"\nНижняя граница водителей: {result.driver_lower_bound}"
+    if result.timings:
+        text += "\nВремя: " + ", ".join(f"{name}={seconds:.2f} с" for name, seconds in result.timings.items())
+    metrics_text.config(text=text)
+    write_comparison_to_csv(straight_metrics, genetic_metrics, 'comparison_results.csv', interval_metrics, result.timings,
+                            result.driver_lower_bound)
+    display_comparison_window(result.straight_schedule, result.genetic_schedule, straight_metrics, genetic_metrics, interval_metrics)
+
+
+#  Расчёт в фоновом потоке: сообщения передаются в окно через очередь 
+POLL_INTERVAL_MS = 100
+worker_thread = None
+cancel_event = None
+worker_queue = queue.Queue()
+
+def schedule_worker(results_queue, stop_event, num_buses, num_drivers_a, num_drivers_b, selected_date):
+    progress = lambda generation, best, mean: results_queue.put(('progress', generation, best, mean))
+    try:
+        result = get_schedule_result(num_buses, num_drivers_a, num_drivers_b, selected_date,
+                                     progress=progress, cancel_event=stop_event)
+    except Exception as e:
+        results_queue.put(('error', str(e)))
+        return
+    if stop_event.is_set():
+        results_queue.put(('cancelled',))
+    else:
+        results_queue.put(('done', result, selected_date))
+
+
+def poll_worker_queue():
+    finished = False
+    try:
+        while not finished:
+            message = worker_queue.get_nowait()
+            if message[0] == 'progress':
+                generation, best, mean = message[1:]
+                progress_bar.config(value=generation)
+                get_comparison_view().add_generation(generation, best, mean)
+                metrics_text.config(text=f"Поколение {generation}/{GENERATIONS}: лучшая оценка={best:.1f}, средняя={mean:.1f}")
+            elif message[0] == 'done':
+                progress_bar.config(value=GENERATIONS)
+                show_schedule_result(message[1], message[2])
+                finished = True
+            elif message[0] == 'cancelled':
+                metrics_text.config(text="Расчёт отменён")
+                finished = True
+            elif message[0] == 'error':
+                metrics_text.config(text=f"Ошибка: {message[1]}")
+                finished = True
+    except queue.Empty:
+        pass
+
+    if finished:
+        run_button.config(state='normal')
+        cancel_button.config(state='disabled')
+    else:
+        root.after(POLL_INTERVAL_MS, poll_worker_queue)
+
 
 #  Функция запуска алгоритмов и отображения результатов 
 def run_algorithms_and_display():
+    global worker_thread, cancel_event
+    if worker_thread is not None and worker_thread.is_alive():
+        return
     try:
         num_buses = int(buses_entry.get())
         num_drivers_a = int(drivers_a_entry.get())
         num_drivers_b = int(drivers_b_entry.get())
         selected_date = date_entry.get_date()
-    
-        straight_schedule = create_straight_schedule(num_buses, num_drivers_a, num_drivers_b, selected_date)
-        genetic_schedule = genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, selected_date)
+    except ValueError as e:
+        metrics_text.config(text=f"Ошибка: {e}")
+        return
 
-        straight_metrics = straight_schedule.calculate_metrics()
-        genetic_metrics = genetic_schedule.calculate_metrics()
+    cancel_event = threading.Event()
+    progress_bar.config(maximum=GENERATIONS, value=0)
+    get_comparison_view().start_run(GENERATIONS)
+    run_button.config(state='disabled')
+    cancel_button.config(state='normal')
+    metrics_text.config(text="Расчёт расписания...")
 
-        display_schedule(straight_schedule, genetic_schedule, schedule_table, selected_date)
+    worker_thread = threading.Thread(target=schedule_worker, daemon=True,
+                                     args=(worker_queue, cancel_event, num_buses, num_drivers_a, num_drivers_b, selected_date))
+    worker_thread.start()
+    root.after(POLL_INTERVAL_MS, poll_worker_queue)
 
-        metrics_text.config(text=f"Прямой: Маршрутов={straight_metrics[0]}, Маршрутов в пик={straight_metrics[1]}, Водителей={straight_metrics[2]} "
-                                 f"Генетический: Маршрутов={genetic_metrics[0]}, Маршрутов в пик={genetic_metrics[1]}, Водителей={genetic_metrics[2]}")
-        write_comparison_to_csv(straight_metrics, genetic_metrics, 'comparison_results.csv')
-        display_comparison_window(straight_schedule, genetic_schedule, straight_metrics, genetic_metrics)
 
-    except ValueError as e:
-        metrics_text.config(text=f"Ошибка: {e}")
+#  Отмена расчёта (ГА останавливается после текущего поколения) 
+def cancel_algorithms():
+    if cancel_event is not None:
+        cancel_event.set()
+        cancel_button.config(state='disabled')
 
 
 #  Функция сохранения расписания в файл 
 def save_schedule_to_file():
+   # Сохраняется то, что показано в таблице; новый расчёт в потоке окна не запускается
+   if last_result is None:
+        metrics_text.config(text="Сначала рассчитайте расписание")
+        return
+   from tkinter import filedialog
    filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV файлы", "*.csv")])
    if filename:
-        num_buses = int(buses_entry.get())
-        num_drivers_a = int(drivers_a_entry.get())
-        num_drivers_b = int(drivers_b_entry.get())
-        selected_date = date_entry.get_date()
-        straight_schedule = create_straight_schedule(num_buses, num_drivers_a, num_drivers_b, selected_date)
-        genetic_schedule = genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, selected_date)
-        write_schedule_to_csv(straight_schedule, genetic_schedule, filename, selected_date)
+        result, selected_date = last_result
+        write_schedule_to_csv(result.straight_schedule, result.genetic_schedule, filename, selected_date, result.interval_schedule)
 
         print("Расписание сохранено в:", filename)
 
 
 #  Создание основного окна 
-root = tk.Tk()
-root.title("Генератор расписания автобусов")
-
-#  Поля ввода 
-# Ввод количества автобусов
-buses_label = tk.Label(root, text="Количество автобусов:")
-buses_label.grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)
-buses_entry = tk.Entry(root)
-buses_entry.insert(0, "8")
-buses_entry.grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
-
-# Ввод количества водителей типа A
-drivers_a_label = tk.Label(root, text="Количество водителей (Тип A):")
-drivers_a_label.grid(row=1, column=0, padx=5, pady=5, sticky=tk.W)
-drivers_a_entry = tk.Entry(root)
-drivers_a_entry.insert(0, "10")
-drivers_a_entry.grid(row=1, column=1, padx=5, pady=5, sticky=tk.W)
-
-# Ввод количества водителей типа B
-drivers_b_label = tk.Label(root, text="Количество водителей (Тип B):")
-drivers_b_label.grid(row=2, column=0, padx=5, pady=5, sticky=tk.W)
-drivers_b_entry = tk.Entry(root)
-drivers_b_entry.insert(0, "5")
-drivers_b_entry.grid(row=2, column=1, padx=5, pady=5, sticky=tk.W)
-
-# Поле для выбора даты
-date_label = tk.Label(root, text="Выберите дату:")
-date_label.grid(row=3, column=0, padx=5, pady=5, sticky=tk.W)
-date_entry = DateEntry(root, width=12, background='white',
-                           year=datetime.date.today().year,
-                            month=datetime.date.today().month,
-                            day=datetime.date.today().day
-                           )
-date_entry.grid(row=3, column=1, padx=5, pady=5, sticky=tk.W)
-
-#  Кнопка запуска алгоритмов 
-run_button = tk.Button(root, text="Сгенерировать расписание", command=run_algorithms_and_display)
-run_button.grid(row=4, column=0, columnspan=2, padx=5, pady=10)
-
-#  Таблица для отображения расписания 
-schedule_table = ttk.Treeview(root, columns=("Algorithm", "Driver ID", "Schedule", "Work Time", "Break Time"), show="headings")
-schedule_table.grid(row=5, column=0, columnspan=2, padx=5, pady=5, sticky="nsew")
-
-root.grid_rowconfigure(5, weight=1)
-root.grid_columnconfigure(0, weight=1)
-root.grid_columnconfigure(1, weight=1)
-
-#Текст для вывода метрик 
-metrics_text = tk.Label(root, text="")
-metrics_text.grid(row=6, column=0, columnspan=2, padx=5, pady=5)
-
-# Кнопка сохранения расписания
-save_button = tk.Button(root, text="Сохранить расписание", command=save_schedule_to_file)
-save_button.grid(row=7, column=0, columnspan=2, padx=5, pady=10)
-
-root.mainloop()
+def run_gui():
+    global root, buses_entry, drivers_a_entry, drivers_b_entry, date_entry, schedule_table, metrics_text
+    global run_button, cancel_button, progress_bar, algorithm_filter
+    import tkinter as tk
+    from tkinter import ttk
+    from tkcalendar import DateEntry
+
+    root = tk.Tk()
+    root.title("Генератор расписания автобусов")
+
+    #  Поля ввода 
+    # Ввод количества автобусов
+    buses_label = tk.Label(root, text="Количество автобусов:")
+    buses_label.grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)
+    buses_entry = tk.Entry(root)
+    buses_entry.insert(0, "8")
+    buses_entry.grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
+
+    # Ввод количества водителей типа A
+    drivers_a_label = tk.Label(root, text="Количество водителей (Тип A):")
+    drivers_a_label.grid(row=1, column=0, padx=5, pady=5, sticky=tk.W)
+    drivers_a_entry = tk.Entry(root)
+    drivers_a_entry.insert(0, "10")
+    drivers_a_entry.grid(row=1, column=1, padx=5, pady=5, sticky=tk.W)
+
+    # Ввод количества водителей типа B
+    drivers_b_label = tk.Label(root, text="Количество водителей (Тип B):")
+    drivers_b_label.grid(row=2, column=0, padx=5, pady=5, sticky=tk.W)
+    drivers_b_entry = tk.Entry(root)
+    drivers_b_entry.insert(0, "5")
+    drivers_b_entry.grid(row=2, column=1, padx=5, pady=5, sticky=tk.W)
+
+    # Поле для выбора даты
+    date_label = tk.Label(root, text="Выберите дату:")
+    date_label.grid(row=3, column=0, padx=5, pady=5, sticky=tk.W)
+    date_entry = DateEntry(root, width=12, background='white',
+                               year=datetime.date.today().year,
+                                month=datetime.date.today().month,
+                                day=datetime.date.today().day
+                               )
+    date_entry.grid(row=3, column=1, padx=5, pady=5, sticky=tk.W)
+
+    #  Кнопка запуска алгоритмов 
+    run_button = tk.Button(root, text="Сгенерировать расписание", command=run_algorithms_and_display)
+    run_button.grid(row=4, column=0, padx=5, pady=10)
+
+    #  Кнопка отмены расчёта 
+    cancel_button = tk.Button(root, text="Отмена", command=cancel_algorithms, state='disabled')
+    cancel_button.grid(row=4, column=1, padx=5, pady=10, sticky=tk.W)
+
+    #  Фильтры таблицы 
+    filter_frame = tk.Frame(root)
+    filter_frame.grid(row=5, column=0, columnspan=2, padx=5, pady=5, sticky=tk.W)
+    tk.Label(filter_frame, text="Алгоритм:").pack(side=tk.LEFT)
+    # Список алгоритмов обновляется по показанному результату (update_algorithm_filter)
+    algorithm_filter = ttk.Combobox(filter_frame, state='readonly', width=14, values=["Все"])
+    algorithm_filter.set("Все")
+    algorithm_filter.pack(side=tk.LEFT, padx=5)
+    tk.Label(filter_frame, text="Тип водителя:").pack(side=tk.LEFT)
+    type_filter = ttk.Combobox(filter_frame, state='readonly', width=6, values=["Все", "A", "B"])
+    type_filter.set("Все")
+    type_filter.pack(side=tk.LEFT, padx=5)
+
+    def apply_filters(event=None):
+        algorithm = algorithm_filter.get()
+        driver_type = type_filter.get()
+        schedule_table.set_filter(None if algorithm == "Все" else algorithm, None if driver_type == "Все" else driver_type)
+
+    algorithm_filter.bind('<<ComboboxSelected>>', apply_filters)
+    type_filter.bind('<<ComboboxSelected>>', apply_filters)
+
+    #  Таблица для отображения расписания 
+    schedule_table = VirtualScheduleTable(root, ScheduleTableModel())
+    schedule_table.grid(row=6, column=0, columnspan=2, padx=5, pady=5, sticky="nsew")
+
+    root.grid_rowconfigure(6, weight=1)
+    root.grid_columnconfigure(0, weight=1)
+    root.grid_columnconfigure(1, weight=1)
+
+    #Текст для вывода метрик 
+    metrics_text = tk.Label(root, text="")
+    metrics_text.grid(row=7, column=0, columnspan=2, padx=5, pady=5)
+
+    # Кнопка сохранения расписания
+    save_button = tk.Button(root, text="Сохранить расписание", command=save_schedule_to_file)
+    save_button.grid(row=8, column=0, columnspan=2, padx=5, pady=10)
+
+    # Индикатор хода генетического алгоритма
+    progress_bar = ttk.Progressbar(root, mode='determinate', maximum=GENERATIONS)
+    progress_bar.grid(row=9, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
+
+    root.mainloop()
+
+
+#  Замеры производительности (без окна) 
+# Для каждого сочетания (автобусы, водители A, водители B, дата, размер популяции,
+# число поколений) замеряются этапы:
+# прямой алгоритм, случайное расписание, оценка, скрещивание+мутация и весь ГА.
+# Время меряется BENCH_REPEATS прогонами без tracemalloc (в отчёт идут минимум
+# и медиана), пиковая память - ещё одним прогоном под tracemalloc. Зерно
+# фиксировано, результаты пишутся в JSON.
+BENCH_REPEATS = 5
+BENCH_BUSES = [8, 32, 128, 512]
+BENCH_DRIVERS = [15, 60, 500, 2000]
+BENCH_DATES = [datetime.date(2024, 5, 20), datetime.date(2024, 5, 25)]  # понедельник и суббота
+BENCH_SEED = 12345
+
+
+def bench_stages(num_buses, num_drivers_a, num_drivers_b, current_date, population_size=None, generations=None):
+    def straight():
+        create_straight_schedule(num_buses, num_drivers_a, num_drivers_b, current_date)
+        return 1
+
+    def random_schedule():
+        generate_random_schedule(num_buses, num_drivers_a, num_drivers_b, current_date)
+        return 1
+
+    population = [generate_random_schedule(num_buses, num_drivers_a, num_drivers_b, current_date)
+                  for _ in range(population_size or POPULATION_SIZE)]
+
+    def evaluate():
+        for schedule in population:
+            schedule.invalidate()
+            fitness(schedule)
+        return len(population)
+
+    def crossover_mutate():
+        for i in range(0, len(population) - 1, 2):
+            mutate(crossover(population[i], population[i + 1]))
+        return len(population) // 2
+
+    # Считаются только действительно оценённые расписания, без попаданий в кэш
+    def genetic():
+        before = FITNESS_CACHE_STATS['misses']
+        genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, current_date,
+                          population_size=population_size, generations=generations)
+        return FITNESS_CACHE_STATS['misses'] - before
+
+    return [('straight', straight), ('random_schedule', random_schedule), ('fitness', evaluate),
+            ('crossover_mutate', crossover_mutate), ('genetic_algorithm', genetic)]
+
+
+def measure_stage(stage, seed, measure_memory=True, repeats=BENCH_REPEATS):
+    wall_times = []
+    for _ in range(max(1, repeats)):
+        random.seed(seed)
+        started = time.perf_counter()
+        items = stage()
+        wall_times.append(time.perf_counter() - started)
+
+    peak_memory = None
+    if measure_memory:
+        random.seed(seed)
+        tracemalloc.start()
+        try:
+            stage()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return min(wall_times), statistics.median(wall_times), items, peak_memory
+
+
+# population_sizes и generation_counts - списки: замер идёт для каждого их сочетания
+def run_benchmarks(buses=BENCH_BUSES, drivers=BENCH_DRIVERS, dates=BENCH_DATES, seed=BENCH_SEED,
+                   population_sizes=None, generation_counts=None, measure_memory=True, stages=None, repeats=BENCH_REPEATS,
+                   log=print):
+    results = []
+    for num_buses, num_drivers in zip(buses, drivers):
+        # Водители делятся между типами A и B в отношении 2:1
+        num_drivers_b = num_drivers // 3
+        num_drivers_a = num_drivers - num_drivers_b
+        for current_date in dates:
+            for population_size, generations in itertools.product(population_sizes or [POPULATION_SIZE],
+                                                                   generation_counts or [GENERATIONS]):
+                random.seed(seed)
+                for name, stage in bench_stages(num_buses, num_drivers_a, num_drivers_b, current_date,
+                                                population_size, generations):
+                    if stages and name not in stages:
+                        continue
+                    wall_time, median_time, items, peak_memory = measure_stage(stage, seed, measure_memory, repeats)
+                    result = {
+                        'stage': name, 'buses': num_buses, 'drivers_a': num_drivers_a, 'drivers_b': num_drivers_b,
+                        'date': current_date.isoformat(), 'weekend': is_weekend(current_date),
+                        'population_size': population_size, 'generations': generations,
+                        'wall_time': wall_time, 'median_wall_time': median_time, 'repeats': max(1, repeats), 'items': items,
+                        'items_per_second': items / wall_time if wall_time else None,
+                        'peak_memory_bytes': peak_memory,
+                    }
+                    results.append(result)
+                    if log:
+                        memory = f"{peak_memory / 1024:.0f} КБ" if peak_memory is not None else "-"
+                        log(f"{name:18} автобусов={num_buses:<4} A={num_drivers_a:<5} B={num_drivers_b:<5} {current_date} "
+                            f"P={population_size:<4} G={generations:<4} "
+                            f"{wall_time * 1000:9.1f} мс (медиана {median_time * 1000:.1f})  {result['items_per_second'] or 0:10.1f}/с  {memory}")
+    return results
+
+
+def benchmark_metadata(seed):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'machine': platform.machine(),
+            'cpu_count': os.cpu_count(), 'seed': seed, 'timestamp': datetime.datetime.now().isoformat(timespec='seconds')}
+
+
+# Сравнение с прошлым прогоном: отношение времени по совпадающим замерам
+def compare_benchmarks(results, previous_results, log=print):
+    key = lambda result: (result['stage'], result['buses'], result['drivers_a'], result['drivers_b'], result['date'],
+                          result['population_size'], result['generations'])
+    previous = {key(result): result for result in previous_results}
+    ratios = []
+    for result in results:
+        old = previous.get(key(result))
+        if old and old['wall_time']:
+            ratio = result['wall_time'] / old['wall_time']
+            ratios.append((key(result), ratio))
+            if log:
+                log(f"{result['stage']:18} автобусов={result['buses']:<4} {result['date']}  x{ratio:.2f}")
+    return ratios
+
+
+#  Перебор сценариев: минимальный парк и состав водителей (без окна) 
+# Для каждого сочетания (автобусы, водители A, водители B, тип дня) прямой и
+# генетический алгоритмы запускаются с несколькими зёрнами, метрики усредняются.
+# Сценарии считаются уровнями по общему числу водителей, от меньшего к большему.
+# Сценарий отбрасывается без расчёта, если при тех же автобусах и типе дня уже
+# есть сценарий не больше по водителям обоих типов, покрывший все рейсы: больше
+# рейсов он не покроет, а водителей у него не меньше.
+SWEEP_SEEDS = 3
+SWEEP_DATES = {'weekday': datetime.date(2024, 5, 20), 'weekend': datetime.date(2024, 5, 25)}
+
+
+def sweep_scenario(task):
+    num_buses, num_drivers_a, num_drivers_b, day_type, current_date, seeds, population_size, generations = task
+    # routes, peak_routes, drivers, feasible по каждому алгоритму
+    totals = {'straight': [0, 0, 0, 0], 'genetic': [0, 0, 0, 0]}
+    demand = 0
+    for seed in seeds:
+        # Один набор рейсов на прогон: по нему считаются спрос и оба алгоритма
+        random.seed(seed)
+        departures = list(iterate_departures(num_buses, current_date))
+        demand += len(route_timetable(num_buses, current_date, departures))
+        schedules = {'straight': create_straight_schedule(num_buses, num_drivers_a, num_drivers_b, current_date, departures),
+                     'genetic': genetic_algorithm(num_buses, num_drivers_a, num_drivers_b, current_date, seed=seed,
+                                                  departures=departures, population_size=population_size,
+                                                  generations=generations)}
+        for name, schedule in schedules.items():
+            # Водители - только те, у кого есть маршрут (как в comparison_metrics)
+            total_routes, peak_routes, used_drivers = comparison_metrics(schedule)
+            totals[name][0] += total_routes
+            totals[name][1] += peak_routes
+            totals[name][2] += used_drivers
+            totals[name][3] += is_feasible(schedule)
+
+    result = {'buses': num_buses, 'drivers_a': num_drivers_a, 'drivers_b': num_drivers_b,
+              'day_type': day_type, 'date': current_date.isoformat(), 'demand': demand / len(seeds)}
+    for name, values in totals.items():
+        routes, peak_routes, drivers, feasible = (value / len(seeds) for value in values)
+        result[name] = {'routes': routes, 'peak_routes': peak_routes, 'drivers': drivers, 'feasible': feasible}
+    # Лучший из допустимых во всех прогонах алгоритмов по той же оценке, что и в
+    # генетическом алгоритме (прямой алгоритм допустим всегда)
+    candidates = [name for name in ('straight', 'genetic') if result[name]['feasible'] == 1] or ['straight']
+    best = max(candidates, key=lambda name: result[name]['routes'] - 0.1 * result[name]['drivers'])
+    result['best'] = best
+    result['routes'] = result[best]['routes']
+    result['drivers'] = result[best]['drivers']
+    result['covered'] = result['routes'] >= result['demand']
+    return result
+
+
+def dominates(first, second):
+    return (first['routes'] >= second['routes'] and first['drivers'] <= second['drivers']
+            and (first['routes'] > second['routes'] or first['drivers'] < second['drivers']))
+
+
+# Фронт Парето (больше рейсов, меньше водителей) отдельно для каждой пары (автобусы, тип дня)
+def pareto_front(results):
+    groups = {}
+    for result in results:
+        groups.setdefault((result['buses'], result['day_type']), []).append(result)
+    front = []
+    for key in sorted(groups):
+        group = groups[key]
+        front.extend(sorted((result for result in group if not any(dominates(other, result) for other in group)),
+                            key=lambda result: (result['drivers'], result['routes'])))
+    return front
+
+
+def run_sweep(buses, drivers_a, drivers_b, day_types=tuple(SWEEP_DATES), seeds=SWEEP_SEEDS, workers=1,
+              population_size=None, generations=None, seed=BENCH_SEED, log=print):
+    rng = random.Random(seed)
+    seed_values = [rng.getrandbits(32) for _ in range(seeds)]
+    levels = {}
+    for num_buses in buses:
+        for day_type in day_types:
+            for num_drivers_a in drivers_a:
+                for num_drivers_b in drivers_b:
+                    if num_drivers_a + num_drivers_b:
+                        levels.setdefault(num_drivers_a + num_drivers_b, []).append((num_buses, num_drivers_a, num_drivers_b, day_type))
+
+    results = []
+    covered = {}   # (автобусы, тип дня) -> [(A, B)] сценариев, покрывших все рейсы
+    pruned = 0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for level in sorted(levels):
+            tasks = []
+            for num_buses, num_drivers_a, num_drivers_b, day_type in levels[level]:
+                if any(a <= num_drivers_a and b <= num_drivers_b for a, b in covered.get((num_buses, day_type), ())):
+                    pruned += 1
+                    continue
+                tasks.append((num_buses, num_drivers_a, num_drivers_b, day_type, SWEEP_DATES[day_type],
+                              seed_values, population_size, generations))
+            level_results = list(pool.map(sweep_scenario, tasks)) if pool is not None else [sweep_scenario(task) for task in tasks]
+            for result in level_results:
+                if result['covered']:
+                    covered.setdefault((result['buses'], result['day_type']), []).append((result['drivers_a'], result['drivers_b']))
+                if log:
+                    log(f"автобусов={result['buses']:<4} A={result['drivers_a']:<4} B={result['drivers_b']:<4} {result['day_type']:8} "
+                        f"рейсов {result['routes']:7.1f} из {result['demand']:7.1f}  водителей {result['drivers']:6.1f}  ({result['best']})")
+            results.extend(level_results)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if log:
+        log(f"Посчитано сценариев: {len(results)}, отброшено как заведомо доминируемые: {pruned}")
+    return results
+
+
+def write_sweep_to_csv(results, front, filename):
+    on_front = {id(result) for result in front}
+    with open(filename, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['Buses', 'Drivers A', 'Drivers B', 'Day Type', 'Demand',
+                         'Straight Routes', 'Straight Peak Routes', 'Straight Drivers', 'Straight Feasible',
+                         'Genetic Routes', 'Genetic Peak Routes', 'Genetic Drivers', 'Genetic Feasible',
+                         'Best', 'Routes', 'Drivers', 'Covered', 'Pareto'])
+        for result in results:
+            writer.writerow([result['buses'], result['drivers_a'], result['drivers_b'], result['day_type'], f"{result['demand']:.1f}",
+                             *(f"{result[name][key]:.1f}" for name in ('straight', 'genetic') for key in ('routes', 'peak_routes', 'drivers', 'feasible')),
+                             result['best'], f"{result['routes']:.1f}", f"{result['drivers']:.1f}",
+                             int(result['covered']), int(id(result) in on_front)])
+
+
+#  Служба расчёта расписаний (asyncio, HTTP/JSON) 
+# Запросы:
+#   POST /jobs              {"buses": 8, "drivers_a": 10, "drivers_b": 5, "date": "2024-05-20", "seed": 1}
+#                           -> 202 и задание {"id": ..., "status": "queued"}; 503, если очередь заполнена
+#   GET  /jobs/<id>         -> состояние задания (queued, running, done, failed)
+#   GET  /jobs/<id>/result  -> метрики и время алгоритмов, с ?events=1 - ещё и события водителей
+#   GET  /status            -> длина очереди, число заданий в работе, счётчики кэша
+# Одинаковый запрос, пока первый в очереди или считается, получает то же задание;
+# готовые результаты берутся из кэша (как в окне). Расчёт идёт в пуле процессов,
+# очередь ограничена SERVICE_QUEUE_SIZE.
+SERVICE_QUEUE_SIZE = 64
+SERVICE_JOB_HISTORY = 1000
+SERVICE_MAX_BODY = 64 * 1024
+JOB_PARAMS = {'buses': int, 'drivers_a': int, 'drivers_b': int, 'seed': int, 'demand': bool,
+              'time_budget': float, 'stall_generations': int, 'target_fitness': float}
+HTTP_REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                409: 'Conflict', 503: 'Service Unavailable'}
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_job_params(data):
+    if not isinstance(data, dict):
+        raise ServiceError(400, "Ожидался объект JSON")
+    unknown = set(data) - set(JOB_PARAMS) - {'date'}
+    if unknown:
+        raise ServiceError(400, f"Неизвестные параметры: {', '.join(sorted(unknown))}")
+    params = {'buses': 8, 'drivers_a': 10, 'drivers_b': 5, 'date': datetime.date.today(), 'seed': None, 'demand': False,
+              'time_budget': None, 'stall_generations': None, 'target_fitness': None}
+    for name, kind in JOB_PARAMS.items():
+        value = data.get(name)
+        if value is None:
+            continue
+        if kind is bool:
+            valid = isinstance(value, bool)
+        elif kind is float:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        else:
+            valid = isinstance(value, int) and not isinstance(value, bool)
+        if not valid:
+            raise ServiceError(400, f"Параметр {name}: ожидалось значение типа {kind.__name__}")
+        params[name] = kind(value)
+    for name in ('buses', 'drivers_a', 'drivers_b'):
+        if params[name] < 0:
+            raise ServiceError(400, f"Параметр {name} не может быть отрицательным")
+    if data.get('date') is not None:
+        try:
+            params['date'] = datetime.datetime.strptime(data['date'], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise ServiceError(400, "Параметр date: ожидалась дата ГГГГ-ММ-ДД")
+    return params
+
+
+def job_cache_key(params):
+    return schedule_cache_key(params['buses'], params['drivers_a'], params['drivers_b'], params['date'], params['seed'],
+                              time_budget=params['time_budget'], stall_generations=params['stall_generations'],
+                              target_fitness=params['target_fitness'], demand=params['demand'])
+
+
+# Задача для процесса-исполнителя
+def service_job(params):
+    return compute_schedule_result(params['buses'], params['drivers_a'], params['drivers_b'], params['date'], params['seed'],
+                                   time_budget=params['time_budget'], stall_generations=params['stall_generations'],
+                                   target_fitness=params['target_fitness'], demand=params['demand'])
+
+
+# Метрики те же, что в окне и CSV сравнения (ScheduleResult, водители с маршрутами)
+def result_to_json(result, events=False):
+    algorithms = [(result.straight_schedule, 'straight'), (result.genetic_schedule, 'genetic')]
+    metrics = {'straight': result.straight_metrics, 'genetic': result.genetic_metrics}
+    if result.interval_schedule is not None:
+        algorithms.append((result.interval_schedule, 'interval'))
+        metrics['interval'] = result.interval_metrics
+    data = {'timings': result.timings, 'driver_lower_bound': result.driver_lower_bound}
+    for name, (total_routes, peak_routes, unique_drivers) in metrics.items():
+        data[name] = {'routes': total_routes, 'peak_routes': peak_routes, 'drivers': unique_drivers}
+    if events:
+        data['events'] = [dict(zip(EXPORT_FIELDS, (algorithm, driver_id, kind, start.isoformat(), end.isoformat())))
+                          for algorithm, driver_id, kind, start, end in iterate_schedule_events(algorithms)]
+    return data
+
+
+class ScheduleJob:
+    def __init__(self, job_id, params, key):
+        self.id = job_id
+        self.params = params
+        self.key = key
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def __repr__(self):
+        return f"ScheduleJob(id={self.id}, status={self.status})"
+
+    def to_json(self):
+        params = dict(self.params, date=self.params['date'].isoformat())
+        return {'id': self.id, 'status': self.status, 'params': params, 'error': self.error,
+                'created': self.created, 'started': self.started, 'finished': self.finished}
+
+
+class ScheduleService:
+    def __init__(self, workers=1, queue_size=SERVICE_QUEUE_SIZE, cache=None):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.cache = cache if cache is not None else SCHEDULE_CACHE
+        self.jobs = OrderedDict()   # id -> задание, не больше SERVICE_JOB_HISTORY завершённых
+        self.in_flight = {}         # ключ кэша -> задание в очереди или в расчёте
+        self.queue = None
+        self.pool = None
+        self._workers = []
+        self._ids = itertools.count(1)
+
+    async def start(self):
+        import asyncio
+        import multiprocessing
+        self.queue = asyncio.Queue(self.queue_size)
+        # Пул запускает процессы лениво, когда сокеты уже открыты; при fork они
+        # унаследовали бы слушающий и клиентские сокеты, и клиент не дождался бы EOF.
+        # Процессы forkserver порождаются из чистого процесса без этих сокетов
+        context = None
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('forkserver')
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        import asyncio
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self.pool.shutdown(cancel_futures=True)
+
+    def submit(self, params):
+        key = job_cache_key(params)
+        job = self.in_flight.get(key)
+        if job is not None:
+            return job, True
+
+        job = ScheduleJob(str(next(self._ids)), params, key)
+        result = self.cache.get(key)
+        if result is not None:
+            job.result = result
+            job.status = 'done'
+            job.started = job.finished = job.created
+        else:
+            from asyncio import QueueFull
+            try:
+                self.queue.put_nowait(job)
+            except QueueFull:
+                raise ServiceError(503, "Очередь заданий заполнена")
+            self.in_flight[key] = job
+        self.jobs[job.id] = job
+        self._forget_old_jobs()
+        return job, False
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - SERVICE_JOB_HISTORY)]:
+            del self.jobs[job_id]
+
+    async def _work(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = 'running'
+            job.started = time.time()
+            try:
+                result = await loop.run_in_executor(self.pool, service_job, job.params)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.status = 'failed'
+                job.error = str(e)
+            else:
+                self.cache.put(job.key, result)
+                job.result = result
+                job.status = 'done'
+            finally:
+                job.finished = time.time()
+                self.in_flight.pop(job.key, None)
+                self.queue.task_done()
+
+    async def handle_connection(self, reader, writer):
+        import asyncio
+        try:
+            status, payload = await self._handle_request(reader)
+        except ServiceError as e:
+            status, payload = e.status, {'error': str(e)}
+        except (ValueError, asyncio.IncompleteReadError):
+            status, payload = 400, {'error': "Неверный запрос"}
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+        writer.write(head.encode('ascii') + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise ServiceError(400, "Неверная строка запроса")
+        method, target, version = request_line
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length') or 0)
+        if not 0 <= length <= SERVICE_MAX_BODY:
+            raise ServiceError(400, "Слишком большое тело запроса")
+        body = await reader.readexactly(length) if length else b''
+
+        path, _, query = target.partition('?')
+        parts = [part for part in path.split('/') if part]
+        if parts == ['jobs']:
+            if method != 'POST':
+                raise ServiceError(405, "Ожидался POST")
+            try:
+                data = json.loads(body.decode('utf-8') or '{}')
+            except ValueError:
+                raise ServiceError(400, "Тело запроса - не JSON")
+            job, duplicate = self.submit(parse_job_params(data))
+            payload = job.to_json()
+            payload['duplicate'] = duplicate
+            return (200 if job.status == 'done' else 202), payload
+        if parts == ['status']:
+            if method != 'GET':
+                raise ServiceError(405, "Ожидался GET")
+            return 200, {'queued': self.queue.qsize(), 'in_flight': len(self.in_flight), 'jobs': len(self.jobs),
+                         'workers': self.workers, 'queue_size': self.queue_size,
+                         'cache_hits': self.cache.hits, 'cache_misses': self.cache.misses}
+        if len(parts) in (2, 3) and parts[0] == 'jobs' and (len(parts) == 2 or parts[2] == 'result'):
+            if method != 'GET':
+                raise ServiceError(405, "Ожидался GET")
+            job = self.jobs.get(parts[1])
+            if job is None:
+                raise ServiceError(404, f"Нет задания {parts[1]}")
+            if len(parts) == 2:
+                return 200, job.to_json()
+            if job.status == 'failed':
+                raise ServiceError(409, f"Задание завершилось ошибкой: {job.error}")
+            if job.status != 'done':
+                raise ServiceError(409, "Задание ещё не выполнено")
+            return 200, result_to_json(job.result, events='events=1' in query.split('&'))
+        raise ServiceError(404, f"Нет адреса {path}")
+
+
+async def serve_schedules(service, host='127.0.0.1', port=8765, unix_path=None):
+    import asyncio
+    await service.start()
+    try:
+        if unix_path:
+            server = await asyncio.start_unix_server(service.handle_connection, path=unix_path)
+            print("Служба расписаний слушает", unix_path)
+        else:
+            server = await asyncio.start_server(service.handle_connection, host, port)
+            print(f"Служба расписаний слушает http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+#  Пакетный запуск из командной строки (без окна) 
+def run_batch(args):
+    current_date = args.date or datetime.date.today()
+    cache = ScheduleResultCache(cache_dir=args.cache_dir) if args.cache_dir else None
+    # С телеметрией алгоритм всегда считается заново, а не берётся из кэша
+    telemetry = GATelemetry() if args.trace else None
+    if telemetry is not None:
+        cache = ScheduleResultCache(maxsize=0)
+
+    result = get_schedule_result(args.buses, args.drivers_a, args.drivers_b, current_date, seed=args.seed,
+                                 workers=args.workers, islands=args.islands,
+                                 migration_interval=args.migration_interval,
+                                 vectorized=args.vectorized, cache=cache, time_budget=args.time_budget,
+                                 stall_generations=args.stall_generations, target_fitness=args.target_fitness,
+                                 telemetry=telemetry, demand=args.demand_fitness)
+
+    write_schedule_to_csv(result.straight_schedule, result.genetic_schedule, args.output, current_date, result.interval_schedule)
+    write_comparison_to_csv(result.straight_metrics, result.genetic_metrics, args.comparison, result.interval_metrics, result.timings,
+                            result.driver_lower_bound)
+    if args.events:
+        algorithms = [(result.straight_schedule, "Straight"), (result.genetic_schedule, "Genetic"), (result.interval_schedule, "Interval")]
+        rows = export_schedule_events(algorithms, args.events, args.events_format)
+        print(f"События ({rows}) сохранены в:", args.events)
+    if args.demand_fitness:
+        for schedule, name in ((result.straight_schedule, "Прямой"), (result.genetic_schedule, "Генетический"),
+                               (result.interval_schedule, "Интервальный")):
+            report = demand_report(schedule, current_date)
+            print(f"{name}: ожидание {report['mean_wait']:.1f} мин, загрузка {report['load']:.0%}, "
+                  f"перевезено {report['served']:.0f}, не перевезено {report['unserved']:.0f}")
+    if telemetry is not None:
+        telemetry.export_trace(args.trace)
+        print("Время фаз ГА:", ", ".join(f"{phase}={seconds:.3f} с" for phase, seconds in telemetry.summary().items()))
+        print("Трасса сохранена в:", args.trace)
+    print("Расписание сохранено в:", args.output)
+    print("Сравнение сохранено в:", args.comparison)
+
+
+def run_plan(args):
+    start_date = args.start
+    end_date = start_date + datetime.timedelta(days=args.days - 1)
+    plan = plan_date_range(start_date, end_date, args.buses, args.drivers_a, args.drivers_b, seed=args.seed,
+                           workers=args.workers, carry_over=not args.no_carry_over)
+    write_schedules_to_csv([(plan, "Plan")], args.output)
+    if args.events:
+        rows = export_schedule_events([(schedule, "Plan") for day, schedule in plan.days], args.events, args.events_format)
+        print(f"События ({rows}) сохранены в:", args.events)
+    total_routes, peak_routes, unique_drivers = plan.calculate_metrics()
+    print(f"Дней: {len(plan.days)}, маршрутов: {total_routes}, в пик: {peak_routes}, водителей: {unique_drivers}")
+    print("План сохранён в:", args.output)
+
+
+def run_bench(args):
+    dates = args.dates or BENCH_DATES
+    if len(args.buses) != len(args.drivers):
+        raise SystemExit("--buses и --drivers должны иметь одинаковую длину")
+    results = run_benchmarks(args.buses, args.drivers, dates, args.seed, args.population, args.generations,
+                             measure_memory=not args.no_memory, stages=args.stages, repeats=args.repeats)
+    report = {'meta': benchmark_metadata(args.seed), 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=2)
+        print("Результаты сохранены в:", args.output)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as previous_file:
+            compare_benchmarks(results, json.load(previous_file)['results'])
+
+
+def parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ожидалась дата ГГГГ-ММ-ДД, получено {value!r}")
+
+
+def parse_count_range(value):
+    # "5" или "5:30:5" (начало:конец:шаг, конец включительно)
+    try:
+        parts = [int(part) for part in value.split(':')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ожидалось число или начало:конец[:шаг], получено {value!r}")
+    if len(parts) == 1:
+        return parts
+    if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] <= 0):
+        raise argparse.ArgumentTypeError(f"Ожидалось число или начало:конец[:шаг], получено {value!r}")
+    start, stop = parts[0], parts[1]
+    step = parts[2] if len(parts) == 3 else 1
+    return list(range(start, stop + 1, step))
+
+
+def run_sweep_command(args):
+    collect = lambda values: sorted({count for value in values for count in value})
+    results = run_sweep(collect(args.buses), collect(args.drivers_a), collect(args.drivers_b), args.day_types,
+                        args.seeds, args.workers, args.population, args.generations, args.seed)
+    front = pareto_front(results)
+    print("Фронт Парето (рейсы / водители):")
+    for result in front:
+        print(f"  автобусов={result['buses']:<4} {result['day_type']:8} A={result['drivers_a']:<4} B={result['drivers_b']:<4} "
+              f"рейсов {result['routes']:7.1f} из {result['demand']:7.1f}  водителей {result['drivers']:6.1f}")
+    write_sweep_to_csv(results, front, args.output)
+    print("Результаты сохранены в:", args.output)
+
+
+def run_serve(args):
+    import asyncio
+    cache = ScheduleResultCache(cache_dir=args.cache_dir) if args.cache_dir else None
+    service = ScheduleService(args.workers, args.queue_size, cache)
+    try:
+        asyncio.run(serve_schedules(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Генератор расписания автобусов")
+    subparsers = parser.add_subparsers(dest='command')
+
+    batch_parser = subparsers.add_parser('batch', help="Сгенерировать расписание без окна и записать CSV")
+    batch_parser.add_argument('--buses', type=int, default=8)
+    batch_parser.add_argument('--drivers-a', type=int, default=10)
+    batch_parser.add_argument('--drivers-b', type=int, default=5)
+    batch_parser.add_argument('--date', type=parse_date, help="Дата в формате ГГГГ-ММ-ДД (по умолчанию сегодня)")
+    batch_parser.add_argument('--seed', type=int)
+    batch_parser.add_argument('--workers', type=int, default=1, help="Число процессов для генетического алгоритма")
+    batch_parser.add_argument('--islands', type=int, default=1, help="Число островов (1 - без модели островов)")
+    batch_parser.add_argument('--migration-interval', type=int, default=ISLAND_MIGRATION_INTERVAL)
+    batch_parser.add_argument('--vectorized', action='store_true', help="Оценивать популяцию пакетно через NumPy")
+    batch_parser.add_argument('--time-budget', type=float, help="Ограничение времени генетического алгоритма, секунды")
+    batch_parser.add_argument('--stall-generations', type=int, help="Остановка после K поколений без улучшения")
+    batch_parser.add_argument('--target-fitness', type=float, help="Остановка при достижении оценки")
+    batch_parser.add_argument('--demand-fitness', action='store_true',
+                              help="Оценивать расписания моделированием пассажиропотока (PASSENGER_FLOW)")
+    batch_parser.add_argument('--trace', help="Файл трассы генетического алгоритма (формат Chrome Trace Event)")
+    batch_parser.add_argument('--cache-dir', help="Каталог для хранения готовых результатов между запусками")
+    batch_parser.add_argument('--events', help="Выгрузка по одной строке на событие (.csv, .jsonl, .parquet, .arrow)")
+    batch_parser.add_argument('--events-format', choices=sorted(set(EXPORT_FORMATS.values())))
+    batch_parser.add_argument('--output', default='schedule.csv')
+    batch_parser.add_argument('--comparison', default='comparison_results.csv')
+    batch_parser.set_defaults(func=run_batch)
+
+    plan_parser = subparsers.add_parser('plan', help="Расписание на диапазон дат (интервальный алгоритм)")
+    plan_parser.add_argument('--start', type=parse_date, required=True, help="Первая дата, ГГГГ-ММ-ДД")
+    plan_parser.add_argument('--days', type=int, default=7)
+    plan_parser.add_argument('--buses', type=int, default=8)
+    plan_parser.add_argument('--drivers-a', type=int, default=10)
+    plan_parser.add_argument('--drivers-b', type=int, default=5)
+    plan_parser.add_argument('--seed', type=int)
+    plan_parser.add_argument('--workers', type=int, default=1)
+    plan_parser.add_argument('--no-carry-over', action='store_true', help="Не переносить часы водителей между днями")
+    plan_parser.add_argument('--events', help="Выгрузка по одной строке на событие (.csv, .jsonl, .parquet, .arrow)")
+    plan_parser.add_argument('--events-format', choices=sorted(set(EXPORT_FORMATS.values())))
+    plan_parser.add_argument('--output', default='plan.csv')
+    plan_parser.set_defaults(func=run_plan)
+
+    bench_parser = subparsers.add_parser('bench', help="Замеры производительности алгоритмов")
+    bench_parser.add_argument('--buses', type=int, nargs='+', default=BENCH_BUSES)
+    bench_parser.add_argument('--drivers', type=int, nargs='+', default=BENCH_DRIVERS, help="Всего водителей для каждого значения --buses")
+    bench_parser.add_argument('--dates', type=parse_date, nargs='+', help="Даты ГГГГ-ММ-ДД (по умолчанию понедельник и суббота)")
+    bench_parser.add_argument('--seed', type=int, default=BENCH_SEED)
+    bench_parser.add_argument('--population', type=int, nargs='+', help="Значения POPULATION_SIZE для замера")
+    bench_parser.add_argument('--generations', type=int, nargs='+', help="Значения GENERATIONS для замера")
+    bench_parser.add_argument('--stages', nargs='+', choices=['straight', 'random_schedule', 'fitness', 'crossover_mutate', 'genetic_algorithm'])
+    bench_parser.add_argument('--repeats', type=int, default=BENCH_REPEATS, help="Прогонов на замер времени (в отчёт идёт минимум)")
+    bench_parser.add_argument('--no-memory', action='store_true', help="Не замерять пиковую память")
+    bench_parser.add_argument('--output', default='bench_results.json')
+    bench_parser.add_argument('--compare', help="JSON прошлого прогона для сравнения")
+    bench_parser.set_defaults(func=run_bench)
+
+    sweep_parser = subparsers.add_parser('sweep', help="Перебор сценариев: автобусы, водители A и B, тип дня")
+    sweep_parser.add_argument('--buses', type=parse_count_range, nargs='+', default=[[8]], help="Числа или диапазоны начало:конец[:шаг]")
+    sweep_parser.add_argument('--drivers-a', type=parse_count_range, nargs='+', default=[list(range(0, 21, 5))])
+    sweep_parser.add_argument('--drivers-b', type=parse_count_range, nargs='+', default=[list(range(0, 11, 5))])
+    sweep_parser.add_argument('--day-types', nargs='+', choices=list(SWEEP_DATES), default=list(SWEEP_DATES))
+    sweep_parser.add_argument('--seeds', type=int, default=SWEEP_SEEDS, help="Число зёрен на сценарий")
+    sweep_parser.add_argument('--seed', type=int, default=BENCH_SEED)
+    sweep_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    sweep_parser.add_argument('--population', type=int, help="POPULATION_SIZE для перебора")
+    sweep_parser.add_argument('--generations', type=int, help="GENERATIONS для перебора")
+    sweep_parser.add_argument('--output', default='sweep_results.csv')
+    sweep_parser.set_defaults(func=run_sweep_command)
+
+    serve_parser = subparsers.add_parser('serve', help="Служба расчёта расписаний (HTTP/JSON)")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--unix', help="Слушать Unix-сокет по этому пути вместо TCP")
+    serve_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Число процессов для расчёта")
+    serve_parser.add_argument('--queue-size', type=int, default=SERVICE_QUEUE_SIZE, help="Наибольшее число заданий в очереди")
+    serve_parser.add_argument('--cache-dir', help="Каталог для хранения готовых результатов между запусками")
+    serve_parser.set_defaults(func=run_serve)
+
+    gui_parser = subparsers.add_parser('gui', help="Открыть окно (по умолчанию)")
+    gui_parser.set_defaults(func=lambda args: run_gui())
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.command is None:
+        run_gui()
+    else:
+        args.func(args)
+
+
+if __name__ == "__main__":
+    main()